@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: bulk
+# Created on: 2026/10/18
+
+import threading
+import time
+
+if not __package__:
+    import codec
+else:
+    from . import codec
+
+# commands allowed to be sent in bulk, they all carry server time as payload
+BULK_COMMANDS = (codec.CMD_TIME_CALIBRATION, codec.CMD_MOTOR_CALIBRATION, codec.CMD_RING)
+
+
+class BulkJob(object):
+
+    def __init__(self, scheduler, targets, cmd_id, rate=200, tick=0.05, logger=None):
+        """
+        paced publishing of one command to many devices, the frame is encoded
+        once per second and only flow counter and checksum are patched for each
+        device, frames are published from scheduler thread in small batches
+        :param scheduler: Scheduler
+        :param targets: list of LLMqttClient
+        :param cmd_id: int, one of BULK_COMMANDS
+        :param rate: float, max frames published per second
+        :param tick: float, seconds between batches
+        :param logger: Logger (or None)
+        """
+        if cmd_id not in BULK_COMMANDS:
+            raise ValueError("command 0x{:02x} can not be sent in bulk".format(cmd_id))
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.cmd_id = cmd_id
+        self.rate = rate
+        self.tick = tick
+        self.logger = logger
+        self.targets = list(targets)
+        self.sent = 0
+        self.failed = 0
+        self.cancelled = False
+        self.t0 = None
+        self.duration = None
+
+        self.__scheduler = scheduler
+        self.__task = None
+        self.__template = None
+        self.__template_ts = None
+        self.__allowance = 0.0
+        self.__last_tick = None
+        self.__done = threading.Event()
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __repr__(self):
+        return "<BulkJob cmd 0x{:02x}, {}/{} sent>".format(self.cmd_id, self.sent, len(self.targets))
+
+    def __frameTemplate(self):
+        now = int(time.time())
+        if now != self.__template_ts:
+            self.__template = bytes(codec.encode(0, self.cmd_id, codec.INT32_LE.pack(now)))
+            self.__template_ts = now
+        return self.__template
+
+    def __finish(self):
+        if self.__done.is_set():
+            return
+        self.duration = time.time() - self.t0
+        self.__done.set()
+        if self.logger is not None:
+            self.logger.INFO("[MQTT] [bulk] command 0x{:02x} sent to {} device(s), {} failed, "
+                             "{:.2f} second(s) spent{}", self.cmd_id, self.sent, self.failed,
+                             self.duration, ", cancelled" if self.cancelled else "")
+
+    def __step(self):
+        self.__task = None
+        if self.cancelled:
+            self.__finish()
+            return
+
+        now = time.time()
+        self.__allowance = min(self.__allowance + (now - self.__last_tick) * self.rate,
+                               max(1.0, self.rate * self.tick))
+        self.__last_tick = now
+
+        while self.__allowance >= 1 and self.sent + self.failed < len(self.targets):
+            con = self.targets[self.sent + self.failed]
+            if con.live and con.sendTemplate(self.__frameTemplate()):
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.__allowance -= 1
+
+        if self.sent + self.failed < len(self.targets):
+            self.__task = self.__scheduler.callLater(self.tick, self.__step)
+        else:
+            self.__finish()
+
+    def start(self):
+        """
+        start publishing
+        :return: BulkJob, self
+        """
+        self.t0 = time.time()
+        self.__last_tick = self.t0
+        self.__allowance = 1.0
+        if self.logger is not None:
+            self.logger.INFO("[MQTT] [bulk] sending command 0x{:02x} to {} device(s) at {} frame(s)/s",
+                             self.cmd_id, len(self.targets), self.rate)
+        self.__task = self.__scheduler.callLater(0, self.__step)
+
+        return self
+
+    def cancel(self):
+        """
+        stop publishing, frames already published are not affected
+        :return: None
+        """
+        self.cancelled = True
+        task = self.__task
+        if task is not None:
+            task.cancel()
+            self.__finish()
+
+    def isDone(self):
+        return self.__done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        wait until all frames published
+        :param timeout: float (or None)
+        :return: bool, True if finished
+        """
+        return self.__done.wait(timeout)
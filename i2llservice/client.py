@@ -5,8 +5,73 @@
 # Filename: client
 # Created on: 2022/9/14
 
-from i2cylib.network import Client
+from i2cylib.network.I2TCP import Client
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import asyncio
 import json
+import threading
+import time
+
+if __name__ == "__main__":
+    from topics import normalizeTopic
+else:
+    from .topics import normalizeTopic
+
+TAGGED_REQUEST = b"\x7f"
+REPLY_FAILED = b"\xff"
+REQUEST_TIMEOUT = 15
+ONLINE_UNKNOWN = 0xff
+EVENT_PUSH = b"\xa0"
+EVENT_ONLINE = 0x01
+EVENT_CALIBRATION = 0x02
+EVENT_SKEW = 0x04
+EVENT_DIRECTORY = 0x08
+EVENT_ALL = EVENT_ONLINE | EVENT_CALIBRATION | EVENT_SKEW | EVENT_DIRECTORY
+DIRECTORY_TTL = 300
+
+
+class RequestFailed(Exception):
+    pass
+
+
+def parseOnlineTable(fed, topics):
+    table = fed[3:3 + int.from_bytes(fed[1:3], "big")]
+    return {topic: bool(flag) for topic, flag in zip(topics, table) if flag != ONLINE_UNKNOWN}
+
+
+def parseFullOnlineTable(fed):
+    cnt = int.from_bytes(fed[1:3], "big")
+    topics = json.loads(fed[3 + cnt:].decode("utf-8"))
+    return {topic: bool(flag) for topic, flag in zip(topics, fed[3:3 + cnt])}
+
+
+def parseVerification(fed):
+    if fed[1] == 0x02:
+        # request rejected by server
+        return False
+    if not fed[1]:
+        return None
+    return int.from_bytes(fed[2:3], "big", signed=True)
+
+
+class ReplyBuffer(list):
+
+    def __init__(self, routers, iterable=()):
+        """
+        package buffer of I2TCP client that hands tagged replies and pushed
+        events to routers instead of keeping them
+        :param routers: dict, {header byte: callable that takes a package and
+                        returns True if consumed}
+        :param iterable: initial packages
+        """
+        super(ReplyBuffer, self).__init__(iterable)
+        self.__routers = routers
+
+    def append(self, item):
+        router = self.__routers.get(item[:1])
+        if router is not None and router(item):
+            return
+        super(ReplyBuffer, self).append(item)
 
 
 class DeviceClient:
@@ -17,72 +82,111 @@ class DeviceClient:
         self.__parent = parent
         self.root_topic = device_root_topic
 
-    def isOnline(self):
-        ret = False
-        if self.__parent.connected:
-            self.__parent.send(b"\x10" + self.root_topic.encode("utf-8"))
-            fed = self.__parent.get(b"\x01", timeout=15)
-            if fed is not None:
-                ret = bool(fed[1])
-        return ret
+    def isOnline(self, wait=True):
+        """
+        check if device is online
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: bool
+        """
+        return self.__parent.query(b"\x10" + self.root_topic.encode("utf-8"), b"\x01",
+                                   lambda fed: bool(fed[1]), False, wait)
 
-    def getStorage(self):
-        ret = None
-        if self.__parent.connected:
-            self.__parent.send(b"\x11" + self.root_topic.encode("utf-8"))
-            fed = self.__parent.get(b"\xe1", timeout=15)
-            if fed is not None:
-                ret = json.loads(fed[1:].decode("utf-8"))
-        return ret
+    def getStorage(self, wait=True):
+        """
+        get storage dict of device
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: dict (or None)
+        """
+        return self.__parent.query(b"\x11" + self.root_topic.encode("utf-8"), b"\xe1",
+                                   lambda fed: json.loads(fed[1:].decode("utf-8")), None, wait)
 
-    def configurateDevice(self, storage=None):
+    def configurateDevice(self, storage=None, wait=True):
+        """
+        update storage of device and send configuration to device
+        :param storage: dict (or None), storage to write, current one if None
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: bool
+        """
         if storage is None:
             storage = self.getStorage()
+        if storage is None:
+            if not wait:
+                future = Future()
+                future.set_result(False)
+                return future
+            return False
 
-        ret = False
-
-        if self.__parent.connected and storage is not None:
-            self.__parent.send(b"\x20" + self.root_topic.encode("utf-8")
-                               + b"," + json.dumps(storage).encode("utf-8"))
-            fed = self.__parent.get(b"\x01", timeout=15)
-            if fed is not None:
-                ret = bool(fed[1])
+        return self.__parent.query(b"\x20" + self.root_topic.encode("utf-8")
+                                   + b"," + json.dumps(storage).encode("utf-8"), b"\x01",
+                                   lambda fed: bool(fed[1]), False, wait)
 
-        return ret
+    def calibrateMotor(self, wait=True):
+        return self.__parent.query(b"\x21" + self.root_topic.encode("utf-8"), b"\x01",
+                                   lambda fed: bool(fed[1]), False, wait)
 
-    def calibrateMotor(self):
-        ret = False
-        if self.__parent.connected:
-            self.__parent.send(b"\x21" + self.root_topic.encode("utf-8"))
-            fed = self.__parent.get(b"\x01", timeout=15)
-            if fed is not None:
-                ret = bool(fed[1])
-        return ret
+    def unlock(self, wait=True):
+        """
+        request unlock
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: bytes, current dynamic key of device (or False)
+        """
+        return self.__parent.query(b"\x22" + self.root_topic.encode("utf-8"), b"\xd2",
+                                   lambda fed: fed[1:], False, wait)
 
-    def unlock(self):
-        ret = False
-        if self.__parent.connected:
-            self.__parent.send(b"\x22" + self.root_topic.encode("utf-8"))
-            fed = self.__parent.get(b"\xd2", timeout=15)
-            if fed is not None:
-                ret = fed[1:]
-        return ret
+    def ringMotor(self, wait=True):
+        return self.__parent.query(b"\x23" + self.root_topic.encode("utf-8"), b"\x01",
+                                   lambda fed: bool(fed[1]), False, wait)
 
-    def ringMotor(self):
-        ret = False
-        if self.__parent.connected:
-            self.__parent.send(b"\x23" + self.root_topic.encode("utf-8"))
-            fed = self.__parent.get(b"\x01", timeout=15)
-            if fed is not None:
-                ret = bool(fed[1])
-        return ret
+    def verifyCode(self, code, tolerance=1, wait=True):
+        """
+        check offline unlock code typed on keypad of device
+        :param code: list of int, keypad digits, 1 to 10 each
+        :param tolerance: int, time slots allowed before or after current one
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: int (or None), slot offset of matched code, None if not matched,
+                 False if request was invalid or server did not answer
+        """
+        return self.__parent.query(b"\x24" + self.root_topic.encode("utf-8") + b","
+                                   + json.dumps({"code": list(code), "tolerance": tolerance}).encode("utf-8"),
+                                   b"\xd4", parseVerification, False, wait)
 
 
 class I2LLClient(Client):
 
     def __init__(self, hostname, port=8421, psk="i2tcppsk",
                  logger=None, watchdog_timeout=15,
-                 max_buffer_size=20):
+                 max_buffer_size=20, pipelined=False,
+                 directory_ttl=DIRECTORY_TTL, watch_directory=False):
+        """
+        I2TCP client of LockingLock server
+        :param hostname: str, server address
+        :param port: int, server port
+        :param psk: str (or bytes), I2TCP PSK
+        :param logger: Logger (or None)
+        :param watchdog_timeout: int
+        :param max_buffer_size: int, max packages waiting in buffer
+        :param pipelined: bool, tag every request with a request ID so that
+                          many requests can be in flight on one connection
+                          (requires server supporting tagged requests)
+        :param directory_ttl: float (or None), seconds before cached device list
+                              is fetched again, never expires if None
+        :param watch_directory: bool, update cached device list from devices
+                                added or removed on server
+        """
+        self.pipelined = pipelined
+        self.directory_ttl = directory_ttl
+        self.__ll_clients = ()
+        self.__ll_index = {}
+        self.__directory_t0 = None
+        self.__directory_lock = threading.Lock()
+        self.__futures = {}
+        self.__futures_lock = threading.Lock()
+        self.__query_lock = threading.RLock()
+        self.__next_id = 0
+        self.__last_sweep = time.time()
+        self.__events = 0
+        self.__event_callbacks = []
+
         if not isinstance(psk, bytes):
             psk = psk.encode("utf-8")
         super(I2LLClient, self).__init__(hostname, port=port, key=psk,
@@ -90,42 +194,461 @@ class I2LLClient(Client):
                                          logger=logger,
                                          max_buffer_size=max_buffer_size)
 
-        self.__ll_clients = []
+        if watch_directory:
+            self.subscribe(self.__onDirectoryEvent, EVENT_DIRECTORY)
+
+    def reset(self, kill_threads=True):
+        super(I2LLClient, self).reset(kill_threads)
+        self.package_buffer = ReplyBuffer({TAGGED_REQUEST: self.__routeReply,
+                                           EVENT_PUSH: self.__routeEvent})
+        with self.__futures_lock:
+            pending = list(self.__futures.values())
+            self.__futures.clear()
+        for ele in pending:
+            if not ele[0].done():
+                ele[0].set_exception(ConnectionError("connection reset"))
+
+    def __routeReply(self, pkg):
+        if len(pkg) < 3:
+            return False
+        req_id = (pkg[1] << 8) | pkg[2]
+        with self.__futures_lock:
+            entry = self.__futures.pop(req_id, None)
+        if entry is None:
+            # reply of an expired request
+            return True
+
+        future, header, parser, default, deadline = entry
+        reply = pkg[3:]
+        try:
+            if reply == REPLY_FAILED:
+                future.set_result(default)
+            elif header is not None and reply[:len(header)] != header:
+                future.set_exception(RequestFailed("unexpected reply {}".format(reply[:1].hex())))
+            elif parser is None:
+                future.set_result(reply)
+            else:
+                future.set_result(parser(reply))
+        except Exception as err:
+            if not future.done():
+                future.set_exception(err)
+
+        return True
+
+    def __routeEvent(self, pkg):
+        if len(pkg) < 6:
+            return False
+        event = pkg[1]
+        value = int.from_bytes(pkg[2:6], "big", signed=True)
+        root_topic = pkg[6:].decode("utf-8")
+        for mask, callback in list(self.__event_callbacks):
+            if mask & event:
+                try:
+                    callback(event, root_topic, value)
+                except Exception as err:
+                    self.logger.ERROR("[I2LL] event callback failed, {}".format(err))
+
+        return True
+
+    def connect(self, timeout=10, auto_reconnect=None):
+        ret = super(I2LLClient, self).connect(timeout=timeout, auto_reconnect=auto_reconnect)
+        # devices may have changed while disconnected
+        self.invalidateDirectory()
+        if ret and self.__events:
+            # subscriptions are kept by server per connection
+            self.query(b"\x14" + bytes((self.__events,)), b"\x01", lambda fed: bool(fed[1]), False)
+        return ret
+
+    def subscribe(self, callback, events=EVENT_ALL):
+        """
+        get device events pushed by server instead of polling, callbacks are
+        called from receiver thread and should return quickly
+        :param callback: callable, callback(event, root_topic, value), value is
+                         online flag, motor offset, clock skew in seconds or
+                         1/0 for device added/removed
+        :param events: int, mask of EVENT_ONLINE, EVENT_CALIBRATION, EVENT_SKEW
+                       and EVENT_DIRECTORY
+        :return: bool, succeed
+        """
+        self.__event_callbacks.append((events, callback))
+        return self.__updateEvents()
+
+    def unsubscribe(self, callback):
+        """
+        remove event callback, server stops pushing events nobody listens to
+        :param callback: callable, callback given to subscribe()
+        :return: bool, succeed
+        """
+        self.__event_callbacks = [ele for ele in self.__event_callbacks if ele[1] is not callback]
+        return self.__updateEvents()
+
+    def __updateEvents(self):
+        events = 0
+        for mask, callback in self.__event_callbacks:
+            events |= mask
+        if events == self.__events:
+            return True
+        self.__events = events
+
+        return self.query(b"\x14" + bytes((events,)), b"\x01", lambda fed: bool(fed[1]), False)
+
+    def __sweep(self, now):
+        # called with futures lock held
+        expired = [key for key, ele in self.__futures.items() if ele[4] < now]
+        for key in expired:
+            future = self.__futures.pop(key)[0]
+            if not future.done():
+                future.set_exception(FutureTimeout("request timed out"))
+        self.__last_sweep = now
+
+    def pending(self):
+        """
+        count requests waiting for reply
+        :return: int
+        """
+        return len(self.__futures)
+
+    def request(self, pkg, header=None, parser=None, default=None, timeout=REQUEST_TIMEOUT):
+        """
+        send a tagged request without waiting for reply
+        :param pkg: bytes, command ID and payload
+        :param header: bytes (or None), expected header of reply
+        :param parser: callable (or None), converts reply to result
+        :param default: result if server reports that request failed
+        :param timeout: float, seconds before request expires
+        :return: Future, resolves to parsed reply
+        """
+        future = Future()
+        if not self.connected:
+            future.set_exception(ConnectionError("not connected"))
+            return future
+
+        now = time.time()
+        with self.__futures_lock:
+            if now - self.__last_sweep > 1:
+                self.__sweep(now)
+            if len(self.__futures) >= 0x10000:
+                future.set_exception(RequestFailed("too many requests in flight"))
+                return future
+            req_id = self.__next_id
+            while req_id in self.__futures:
+                req_id = (req_id + 1) & 0xffff
+            self.__next_id = (req_id + 1) & 0xffff
+            self.__futures.update({req_id: (future, header, parser, default, now + timeout)})
+
+        try:
+            self.send(TAGGED_REQUEST + req_id.to_bytes(2, "big") + pkg)
+        except Exception as err:
+            with self.__futures_lock:
+                self.__futures.pop(req_id, None)
+            future.set_exception(err)
+
+        return future
+
+    def query(self, pkg, header, parser, default=None, wait=True):
+        """
+        send a command and wait for its reply
+        :param pkg: bytes, command ID and payload
+        :param header: bytes, expected header of reply
+        :param parser: callable, converts reply to result
+        :param default: result if there is no reply
+        :param wait: bool, False to get a Future instead of waiting (pipelined client only)
+        :return: parsed reply (or default)
+        """
+        if self.pipelined:
+            future = self.request(pkg, header, parser, default)
+            if not wait:
+                return future
+            try:
+                return future.result(REQUEST_TIMEOUT)
+            except Exception:
+                return default
+
+        if not wait:
+            raise ValueError("wait=False requires a pipelined client")
+        ret = default
+        with self.__query_lock:
+            # untagged replies can only be matched by header, one request at a time
+            if self.connected:
+                self.send(pkg)
+                fed = self.get(header, timeout=REQUEST_TIMEOUT)
+                if fed is not None:
+                    ret = parser(fed)
+        return ret
+
+    def getOnlineTable(self, root_topics=None):
+        """
+        get online status of many devices in one round-trip
+        :param root_topics: list (or None), root topics of devices, all devices if None
+        :return: dict, {root_topic: bool}, unknown devices are left out (or None)
+        """
+        if root_topics is None:
+            return self.query(b"\x12", b"\xc3", parseFullOnlineTable)
+
+        topics = list(root_topics)
+        return self.query(b"\x12" + json.dumps(topics).encode("utf-8"), b"\xc1",
+                          lambda fed: parseOnlineTable(fed, topics))
+
+    def getStorageTable(self, root_topics=None):
+        """
+        get storage dicts of many devices in one round-trip
+        :param root_topics: list (or None), root topics of devices, all devices if None
+        :return: dict, {root_topic: dict}, unknown devices are left out (or None)
+        """
+        pkg = b"\x13"
+        if root_topics is not None:
+            pkg += json.dumps(list(root_topics)).encode("utf-8")
+
+        return self.query(pkg, b"\xc2", lambda fed: json.loads(fed[1:].decode("utf-8")))
 
     def __len__(self):
-        if not len(self.__ll_clients):
-            self.getAllRootTopics()
-        return len(self.__ll_clients)
+        return len(self.__directory())
 
     def __iter__(self):
-        if not len(self.__ll_clients):
-            self.getAllRootTopics()
-        return self.__ll_clients
+        return iter(self.__directory())
 
     def __getitem__(self, item):
-        if not len(self.__ll_clients):
-            self.getAllRootTopics()
-        return self.__ll_clients[item]
+        return self.__directory()[item]
 
-    def getAllRootTopics(self):
+    def __directory(self):
+        # cached device list, fetched again once expired if connection allows
+        t0 = self.__directory_t0
+        if t0 is None or (self.directory_ttl is not None and time.time() - t0 > self.directory_ttl
+                          and self.connected):
+            if not self.refreshDirectory() and t0 is None:
+                raise ConnectionError("failed to get device list from server")
+        return self.__ll_clients
+
+    def refreshDirectory(self):
+        """
+        fetch device list from server, device clients of unchanged root topics
+        are kept
+        :return: bool, succeed
+        """
         assert self.connected
-        pkg = b"\x01"
-        self.send(pkg)
-        pkg = self.get(b"\xf1", timeout=15)
+        all_topics = self.query(b"\x01", b"\xf1", lambda fed: json.loads(fed[1:].decode("utf-8")))
+        if all_topics is None:
+            return False
 
-        if pkg is not None:
-            self.__ll_clients.clear()
-            all_topics = json.loads(pkg[1:].decode())
+        with self.__directory_lock:
+            old_index = self.__ll_index
+            clients = []
+            index = {}
             for i in all_topics:
-                self.__ll_clients.append(DeviceClient(self, i))
+                topic = normalizeTopic(i)
+                con = old_index.get(topic)
+                if con is None or con.root_topic != i or topic in index:
+                    con = DeviceClient(self, i)
+                clients.append(con)
+                index.setdefault(topic, con)
+            self.__ll_clients = tuple(clients)
+            self.__ll_index = index
+            self.__directory_t0 = time.time()
+
+        return True
+
+    def invalidateDirectory(self):
+        """
+        drop cached device list, it is fetched again on next use
+        :return: None
+        """
+        self.__directory_t0 = None
+
+    def getAllRootTopics(self):
+        return self.refreshDirectory()
+
+    def __onDirectoryEvent(self, event, root_topic, value):
+        with self.__directory_lock:
+            if self.__directory_t0 is None:
+                return
+            topic = normalizeTopic(root_topic)
+            if value:
+                if topic not in self.__ll_index:
+                    con = DeviceClient(self, root_topic)
+                    self.__ll_clients += (con,)
+                    self.__ll_index.update({topic: con})
+            else:
+                con = self.__ll_index.pop(topic, None)
+                if con is not None:
+                    self.__ll_clients = tuple(ele for ele in self.__ll_clients if ele is not con)
+
+    def getDeviceClient(self, root_topic, prefix=False):
+        """
+        get device client by its root topic
+        :param root_topic: str, root topic of device (trailing slash ignored)
+        :param prefix: bool, fall back to the device with the longest root
+                       topic that covers given topic if no exact match found
+        :return: DeviceClient (or None)
+        """
+        self.__directory()
+        index = self.__ll_index
+        root_topic = normalizeTopic(root_topic)
+        ret = index.get(root_topic)
+
+        while ret is None and prefix and "/" in root_topic:
+            root_topic = root_topic[:root_topic.rindex("/")]
+            ret = index.get(root_topic)
+
+        return ret
+
+
+class AsyncI2LLClient:
+
+    def __init__(self, hostname, port=8421, psk="i2tcppsk",
+                 logger=None, watchdog_timeout=15, max_buffer_size=20):
+        """
+        asyncio wrapper of a pipelined I2LLClient, any number of requests can
+        be awaited concurrently over one I2TCP session
+        :param hostname: str, server address
+        :param port: int, server port
+        :param psk: str (or bytes), I2TCP PSK
+        :param logger: Logger (or None)
+        :param watchdog_timeout: int
+        :param max_buffer_size: int, max packages waiting in buffer
+        """
+        self.client = I2LLClient(hostname, port=port, psk=psk, logger=logger,
+                                 watchdog_timeout=watchdog_timeout,
+                                 max_buffer_size=max_buffer_size, pipelined=True)
+
+    async def __aenter__(self):
+        if not await self.connect():
+            raise ConnectionError("failed to connect to {}:{}".format(*self.client.address))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def connected(self):
+        return self.client.connected
+
+    async def connect(self, timeout=10, auto_reconnect=None):
+        """
+        connect to server without blocking event loop
+        :param timeout: int, seconds
+        :param auto_reconnect: bool (or None)
+        :return: bool, succeed
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.client.connect, timeout, auto_reconnect)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.client.reset)
+
+    async def __request(self, pkg, header, parser, default, timeout):
+        future = asyncio.wrap_future(self.client.request(pkg, header, parser, default, timeout))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, FutureTimeout, ConnectionError, RequestFailed):
+            return default
+
+    async def root_topics(self, timeout=REQUEST_TIMEOUT):
+        """
+        get root topics of all devices
+        :param timeout: float, seconds
+        :return: list (or None)
+        """
+        return await self.__request(b"\x01", b"\xf1", lambda fed: json.loads(fed[1:].decode("utf-8")),
+                                    None, timeout)
+
+    async def is_online(self, root_topic, timeout=REQUEST_TIMEOUT):
+        """
+        check if device is online
+        :param root_topic: str, root topic of device
+        :param timeout: float, seconds
+        :return: bool
+        """
+        return await self.__request(b"\x10" + root_topic.encode("utf-8"), b"\x01",
+                                    lambda fed: bool(fed[1]), False, timeout)
+
+    async def get_storage(self, root_topic, timeout=REQUEST_TIMEOUT):
+        """
+        get storage dict of device
+        :param root_topic: str, root topic of device
+        :param timeout: float, seconds
+        :return: dict (or None)
+        """
+        return await self.__request(b"\x11" + root_topic.encode("utf-8"), b"\xe1",
+                                    lambda fed: json.loads(fed[1:].decode("utf-8")), None, timeout)
+
+    async def configure(self, root_topic, storage=None, timeout=REQUEST_TIMEOUT):
+        """
+        update storage of device and send configuration to device
+        :param root_topic: str, root topic of device
+        :param storage: dict (or None), storage to write, current one if None
+        :param timeout: float, seconds
+        :return: bool
+        """
+        if storage is None:
+            storage = await self.get_storage(root_topic, timeout)
+        if storage is None:
+            return False
+
+        return await self.__request(b"\x20" + root_topic.encode("utf-8")
+                                    + b"," + json.dumps(storage).encode("utf-8"), b"\x01",
+                                    lambda fed: bool(fed[1]), False, timeout)
+
+    async def calibrate(self, root_topic, timeout=REQUEST_TIMEOUT):
+        return await self.__request(b"\x21" + root_topic.encode("utf-8"), b"\x01",
+                                    lambda fed: bool(fed[1]), False, timeout)
+
+    async def unlock(self, root_topic, timeout=REQUEST_TIMEOUT):
+        """
+        request unlock
+        :param root_topic: str, root topic of device
+        :param timeout: float, seconds
+        :return: bytes, current dynamic key of device (or False)
+        """
+        return await self.__request(b"\x22" + root_topic.encode("utf-8"), b"\xd2",
+                                    lambda fed: fed[1:], False, timeout)
+
+    async def ring(self, root_topic, timeout=REQUEST_TIMEOUT):
+        return await self.__request(b"\x23" + root_topic.encode("utf-8"), b"\x01",
+                                    lambda fed: bool(fed[1]), False, timeout)
+
+    async def verify_code(self, root_topic, code, tolerance=1, timeout=REQUEST_TIMEOUT):
+        """
+        check offline unlock code typed on keypad of device
+        :param root_topic: str, root topic of device
+        :param code: list of int, keypad digits, 1 to 10 each
+        :param tolerance: int, time slots allowed before or after current one
+        :param timeout: float, seconds
+        :return: int (or None), slot offset of matched code, None if not matched,
+                 False if request was invalid or server did not answer
+        """
+        return await self.__request(b"\x24" + root_topic.encode("utf-8") + b","
+                                    + json.dumps({"code": list(code), "tolerance": tolerance}).encode("utf-8"),
+                                    b"\xd4", parseVerification, False, timeout)
+
+    async def get_online_table(self, root_topics=None, timeout=REQUEST_TIMEOUT):
+        """
+        get online status of many devices in one round-trip
+        :param root_topics: list (or None), root topics of devices, all devices if None
+        :param timeout: float, seconds
+        :return: dict, {root_topic: bool}, unknown devices are left out (or None)
+        """
+        if root_topics is None:
+            return await self.__request(b"\x12", b"\xc3", parseFullOnlineTable, None, timeout)
+
+        topics = list(root_topics)
+        return await self.__request(b"\x12" + json.dumps(topics).encode("utf-8"), b"\xc1",
+                                    lambda fed: parseOnlineTable(fed, topics), None, timeout)
+
+    async def get_storage_table(self, root_topics=None, timeout=REQUEST_TIMEOUT):
+        """
+        get storage dicts of many devices in one round-trip
+        :param root_topics: list (or None), root topics of devices, all devices if None
+        :param timeout: float, seconds
+        :return: dict, {root_topic: dict}, unknown devices are left out (or None)
+        """
+        pkg = b"\x13"
+        if root_topics is not None:
+            pkg += json.dumps(list(root_topics)).encode("utf-8")
 
-    def getDeviceClient(self, root_topic):
-        con: (DeviceClient, None)
+        return await self.__request(pkg, b"\xc2", lambda fed: json.loads(fed[1:].decode("utf-8")),
+                                    None, timeout)
 
-        for con in self.__ll_clients:
-            assert isinstance(con, DeviceClient)
-            if con.root_topic in root_topic:
-                return con
 
 if __name__ == '__main__':
     clt = I2LLClient("i2cy.tech")
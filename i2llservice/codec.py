@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: codec
+# Created on: 2026/10/18
+
+import struct
+
+# frame layout: flow counter (uint8), command ID (uint8),
+# payload length (uint16, big endian), payload, checksum (uint8, sum of all bytes before it)
+HEADER = struct.Struct(">BBH")
+HEADER_SIZE = HEADER.size
+FRAME_OVERHEAD = HEADER_SIZE + 1
+MAX_PAYLOAD = 0xffff
+
+INT32_LE = struct.Struct("<i")
+INT32_BE = struct.Struct(">i")
+UINT32_LE = struct.Struct("<I")
+
+# device -> server
+CMD_HEARTBEAT = 0x00
+CMD_TIME_REQUEST = 0x01
+CMD_CONFIG_REQUEST = 0x02
+CMD_CALIBRATION_DATA = 0x30
+CMD_DEVICE_OK = 0xff
+
+# server -> device
+CMD_OK = 0xee
+CMD_TIME_CALIBRATION = 0x11
+CMD_CONFIGURATION = 0x12
+CMD_MOTOR_CALIBRATION = 0x13
+CMD_UNLOCK = 0x20
+CMD_RING = 0x21
+
+# command IDs as metric label values
+CMD_LABELS = tuple("0x{:02x}".format(i) for i in range(256))
+
+
+class FrameError(ValueError):
+    pass
+
+
+class ChecksumError(FrameError):
+    pass
+
+
+def frameSize(payload_length: int) -> int:
+    """
+    get size of encoded frame
+    :param payload_length: int
+    :return: int
+    """
+    return payload_length + FRAME_OVERHEAD
+
+
+def encodeInto(buf, offset: int, flow_cnt: int, cmd_id: int, payload) -> int:
+    """
+    encode a frame into a writable buffer, nothing is allocated, only usable
+    when caller owns buffer until frame is consumed (publishing hands frame
+    over to MQTT client, which may keep it until sent)
+    :param buf: bytearray (or writable memoryview), target buffer
+    :param offset: int, position in buffer to write frame at
+    :param flow_cnt: int, flow counter, wrapped into 0 ~ 255
+    :param cmd_id: int, command ID
+    :param payload: bytes-like
+    :return: int, size of frame written
+    """
+    length = len(payload)
+    if length > MAX_PAYLOAD:
+        raise FrameError("payload too long ({} bytes)".format(length))
+    flow_cnt &= 0xff
+    end = offset + HEADER_SIZE + length
+
+    HEADER.pack_into(buf, offset, flow_cnt, cmd_id, length)
+    buf[offset + HEADER_SIZE:end] = payload
+    buf[end] = (flow_cnt + cmd_id + (length >> 8) + (length & 0xff) + sum(payload)) & 0xff
+
+    return end + 1 - offset
+
+
+def encode(flow_cnt: int, cmd_id: int, payload) -> bytearray:
+    """
+    encode a frame into a new buffer, one allocation per frame
+    :param flow_cnt: int, flow counter, wrapped into 0 ~ 255
+    :param cmd_id: int, command ID
+    :param payload: bytes-like
+    :return: bytearray, frame
+    """
+    buf = bytearray(len(payload) + FRAME_OVERHEAD)
+    encodeInto(buf, 0, flow_cnt, cmd_id, payload)
+
+    return buf
+
+
+def decode(data, _unpack=HEADER.unpack_from):
+    """
+    validate and decode a frame
+    :param data: bytes-like, frame
+    :return: tuple (flow counter, command ID, payload of the same type as data)
+    """
+    size = len(data)
+    if size < FRAME_OVERHEAD:
+        raise FrameError("frame too short ({} bytes)".format(size))
+
+    flow_cnt, cmd_id, length = _unpack(data)
+    if size < length + FRAME_OVERHEAD:
+        raise FrameError("frame truncated, {} bytes of payload declared but {} received".format(
+            length, size - FRAME_OVERHEAD))
+
+    check_sum = data[-1]
+    if (sum(data) - check_sum) & 0xff != check_sum:
+        raise ChecksumError("checksum mismatch")
+
+    # slicing short payloads is cheaper than wrapping frame in a memoryview
+    return flow_cnt, cmd_id, data[HEADER_SIZE:HEADER_SIZE + length]
+
+
+def patchFlowCounter(frame, flow_cnt: int, offset: int = 0) -> None:
+    """
+    replace flow counter of an encoded frame in place and fix its checksum
+    :param frame: bytearray (or writable memoryview)
+    :param flow_cnt: int, new flow counter
+    :param offset: int, position of frame in buffer
+    :return: None
+    """
+    flow_cnt &= 0xff
+    length = (frame[offset + 2] << 8) | frame[offset + 3]
+    end = offset + HEADER_SIZE + length
+    frame[end] = (frame[end] - frame[offset] + flow_cnt) & 0xff
+    frame[offset] = flow_cnt
+
+
+if __name__ == '__main__':
+    frm = encode(1, CMD_TIME_CALIBRATION, INT32_LE.pack(1666666666))
+    print("encoded: {}".format(frm.hex()))
+    print("decoded: {}".format(decode(bytes(frm))))
+    patchFlowCounter(frm, 300)
+    print("patched: {}".format(frm.hex()))
+    print("decoded: {}".format(decode(bytes(frm))))
@@ -6,56 +6,84 @@
 # Created on: 2022/9/6
 
 
-import json
 import os
 from i2cylib.utils import i2TecHome, DirTree
 
+if not __package__:
+    from storage import openStore
+else:
+    from .storage import openStore
+
+STATE_FLUSH_DELAY = 30
+
 
 class DeviceConfig:
 
-    def __init__(self, file_io, device_index_str, new=False):
+    def __init__(self, store, device_index_str, new=False, record=None):
         self.device_index = device_index_str
-        self.__file_io = open(file_io.name, "r")
-        json_dict = json.load(self.__file_io)
+        self.__store = store
+        self.__state_dirty = False
         if new:
             self.root_topic = "/esp32ll/dev_{}".format(device_index_str)
             self.dynkey16_psk = "dynkey16psk"
             self.storage = {"motor_offset": 0}
+            self.state = {}
             self.saveConfig()
         else:
-            self.root_topic = json_dict["devices"][device_index_str]["mqtt_topic_root"]
-            self.dynkey16_psk = json_dict["devices"][device_index_str]["dynkey16_psk"]
-            self.storage = json_dict["devices"][device_index_str]["storage"]
-        self.__file_io.close()
+            if record is None:
+                record = store.getDevices()[device_index_str]
+            self.root_topic = record["mqtt_topic_root"]
+            self.dynkey16_psk = record["dynkey16_psk"]
+            self.storage = record["storage"]
+            self.state = record.get("state", {})
 
     def __str__(self):
         return "<LL device, index: {}, topic: {}>".format(self.device_index, self.root_topic)
 
     def saveConfig(self):
-        self.__file_io = open(self.__file_io.name, "r")
-        json_dict = json.load(self.__file_io)
-        self.__file_io.close()
-
-        new_device_dict = {self.device_index: {
+        self.__store.setDevice(self.device_index, {
             "mqtt_topic_root": self.root_topic,
             "dynkey16_psk": self.dynkey16_psk,
-            "storage": self.storage
-        }}
-        json_dict["devices"].update(new_device_dict)
-
-        self.__file_io = open(self.__file_io.name, "w")
-        json.dump(json_dict, self.__file_io, indent=2)
-        self.__file_io.close()
+            "storage": self.storage,
+            "state": self.state
+        })
+
+    def saveStorage(self):
+        """
+        persist storage of device only, writes within the flush delay of
+        config store are merged
+        :return: None
+        """
+        self.__store.updateDevice(self.device_index, {"storage": self.storage})
+
+    def updateState(self, **kwargs):
+        """
+        update runtime state of device (e.g. last_seen, clock_skew), it is
+        only marked dirty here and read by config store when writing back, at
+        most once per STATE_FLUSH_DELAY seconds, unchanged state is not written
+        :param kwargs: state items
+        :return: None
+        """
+        if all(k in self.state and self.state[k] == v for k, v in kwargs.items()):
+            return
+        self.state.update(kwargs)
+        if not self.__state_dirty:
+            self.__state_dirty = True
+            self.__store.deferUpdate(self.device_index, self.__collectState, STATE_FLUSH_DELAY)
+
+    def __collectState(self):
+        self.__state_dirty = False
+        return {"state": dict(self.state)}
 
 
 class Config(list):
 
-    def __init__(self, filename):
+    def __init__(self, filename, flush_delay=1.0):
         super(Config, self).__init__([])
 
         if os.path.exists(filename) and os.path.isfile(filename):
-            self.__file_io = open(filename, "r")
-            json_dict = json.load(self.__file_io)
+            self.__store = openStore(filename, flush_delay)
+            json_dict = self.__store.getGlobals()
 
             self.mqtt_host = json_dict["mqtt_host"]
             self.mqtt_port = json_dict["mqtt_port"]
@@ -66,40 +94,56 @@ class Config(list):
             self.log_file = json_dict["log_file"]
             self.log_level = json_dict["log_level"]
             self.mqtt_client_id = json_dict["mqtt_client_id"]
-
-            self.__file_io.close()
+            self.mqtt_bulk_rate = json_dict.get("mqtt_bulk_rate", 200)
+            self.mqtt_time_topic = json_dict.get("mqtt_time_topic", "")
+            self.mqtt_time_interval = json_dict.get("mqtt_time_interval", 60)
+            self.i2tcp_workers = json_dict.get("i2tcp_workers", 0)
+            self.log_max_bytes = json_dict.get("log_max_bytes", 10 * 1024 * 1024)
+            self.log_backup_count = json_dict.get("log_backup_count", 5)
+            self.log_rotate_interval = json_dict.get("log_rotate_interval", 0)
+            self.log_rx_rate = json_dict.get("log_rx_rate", 2.0)
+            self.metrics_host = json_dict.get("metrics_host", "127.0.0.1")
+            self.metrics_port = json_dict.get("metrics_port", 0)
 
         else:
-            self.__file_io = open(filename, "w")
-            self.__file_io.close()
+            self.__store = openStore(filename, flush_delay)
             self.mqtt_host = "127.0.0.1"
             self.mqtt_port = 1883
             self.mqtt_user = "admin"
             self.mqtt_password = "admin"
             self.mqtt_client_id = "I2LL-Service"
+            self.mqtt_bulk_rate = 200
+            self.mqtt_time_topic = ""
+            self.mqtt_time_interval = 60
             self.i2tcp_port = 8421
             self.i2tcp_psk = "i2tcppsk"
+            self.i2tcp_workers = 0
             self.log_file = DirTree(i2TecHome(), "i2ll", "i2ll.log").asPosix()
             self.log_level = "DEBUG"
+            self.log_max_bytes = 10 * 1024 * 1024
+            self.log_backup_count = 5
+            self.log_rotate_interval = 0
+            self.log_rx_rate = 2.0
+            self.metrics_host = "127.0.0.1"
+            self.metrics_port = 0
 
             self.saveConfig(new=True)
+            self.__store.flush()
 
         self.__current_device_cnt = -1
         self.__loadDeviceConfig()
 
     def __str__(self):
-        return "LockingLock server config object ({})".format(self.__file_io.name)
+        return "LockingLock server config object ({})".format(self.__store)
 
     def __loadDeviceConfig(self):
-        self.__file_io = open(self.__file_io.name, "r")
-        data_raw = json.load(self.__file_io)
-        self.__file_io.close()
+        records = self.__store.getDevices()
 
-        devices = list(data_raw["devices"].keys())
+        devices = list(records.keys())
         devices.sort()
 
         for key in devices:
-            self.append(DeviceConfig(self.__file_io, key))
+            self.append(DeviceConfig(self.__store, key, record=records[key]))
             if self.__current_device_cnt < int(key):
                 self.__current_device_cnt = int(key)
 
@@ -110,7 +154,7 @@ class Config(list):
             device_id = self.__current_device_cnt
         device_id = str(device_id)
 
-        new_device = DeviceConfig(self.__file_io, device_id, new=True)
+        new_device = DeviceConfig(self.__store, device_id, new=True)
         self.append(new_device)
 
         return new_device
@@ -129,18 +173,7 @@ class Config(list):
 
         if succeed:
             self.pop(target_index)
-
-            if self.__file_io.closed:
-                self.__file_io = open(self.__file_io.name, "r")
-            self.__file_io.seek(0)
-            data_raw = json.load(self.__file_io)
-            self.__file_io.close()
-
-            data_raw["devices"].pop(device_id)
-
-            self.__file_io = open(self.__file_io.name, "w")
-            json.dump(data_raw, self.__file_io, indent=2)
-            self.__file_io.close()
+            self.__store.removeDevice(device_id)
 
         return succeed
 
@@ -151,13 +184,6 @@ class Config(list):
         return ret
 
     def saveConfig(self, new=False):
-        if new:
-            json_dict = {}
-        else:
-            self.__file_io = open(self.__file_io.name, "r")
-            json_dict = json.load(self.__file_io)
-            self.__file_io.close()
-
         new_device_dict = {
             "mqtt_host": self.mqtt_host,
             "mqtt_port": self.mqtt_port,
@@ -165,17 +191,37 @@ class Config(list):
             "mqtt_password": self.mqtt_password,
             "i2tcp_port": self.i2tcp_port,
             "i2tcp_psk": self.i2tcp_psk,
+            "i2tcp_workers": self.i2tcp_workers,
             "log_file": self.log_file,
             "log_level": self.log_level,
-            "mqtt_client_id": self.mqtt_client_id
+            "log_max_bytes": self.log_max_bytes,
+            "log_backup_count": self.log_backup_count,
+            "log_rotate_interval": self.log_rotate_interval,
+            "log_rx_rate": self.log_rx_rate,
+            "metrics_host": self.metrics_host,
+            "metrics_port": self.metrics_port,
+            "mqtt_client_id": self.mqtt_client_id,
+            "mqtt_bulk_rate": self.mqtt_bulk_rate,
+            "mqtt_time_topic": self.mqtt_time_topic,
+            "mqtt_time_interval": self.mqtt_time_interval
         }
-        json_dict.update(new_device_dict)
+        self.__store.setGlobals(new_device_dict)
         if new:
-            json_dict.update({"devices": {}})
+            self.__store.clearDevices()
+
+    def flush(self):
+        """
+        write pending changes to config file immediately
+        :return: None
+        """
+        self.__store.flush()
 
-        self.__file_io = open(self.__file_io.name, "w")
-        json.dump(json_dict, self.__file_io, indent=2)
-        self.__file_io.close()
+    def close(self):
+        """
+        write pending changes and release config store
+        :return: None
+        """
+        self.__store.close()
 
 
 if __name__ == '__main__':
@@ -196,6 +242,7 @@ if __name__ == '__main__':
     dev_conf = conf.getDevice(-1)
     dev_conf.root_topic = "/test/topic/edtied"
     dev_conf.saveConfig()
+    conf.flush()
 
     f = open("sample/config.json", "r")
     print("displaying config now:")
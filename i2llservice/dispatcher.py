@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: dispatcher
+# Created on: 2026/10/18
+
+import collections
+import queue
+import threading
+import time
+
+
+class NotifyingBuffer(list):
+
+    def __init__(self, callback, iterable=()):
+        """
+        package buffer of I2TCP handler that calls back on every new package,
+        also remembers arrival time of packages
+        :param callback: callable, called after every append
+        :param iterable: initial packages
+        """
+        super(NotifyingBuffer, self).__init__(iterable)
+        self.__callback = callback
+        now = time.time()
+        self.__timestamps = [now] * len(self)
+        self.last_timestamp = now
+
+    def append(self, item):
+        self.__timestamps.append(time.time())
+        super(NotifyingBuffer, self).append(item)
+        self.__callback()
+
+    def pop(self, index=-1):
+        ret = super(NotifyingBuffer, self).pop(index)
+        if self.__timestamps:
+            self.last_timestamp = self.__timestamps.pop(index)
+        return ret
+
+    def prepend(self, items, timestamp=None):
+        """
+        insert packages in front of buffer
+        :param items: list of packages
+        :param timestamp: float (or None), arrival time of packages
+        :return: None
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self[0:0] = items
+        self.__timestamps[0:0] = [timestamp] * len(items)
+
+
+class ConnectionTable(dict):
+
+    def __init__(self, callback):
+        """
+        connection table of I2TCP server that calls back when a connection is
+        placed into it
+        :param callback: callable
+        """
+        super(ConnectionTable, self).__init__()
+        self.__callback = callback
+
+    def update(self, *args, **kwargs):
+        super(ConnectionTable, self).update(*args, **kwargs)
+        self.__callback()
+
+
+class SerialExecutor(object):
+
+    def __init__(self, max_pending=32, on_done=None, logger=None):
+        """
+        thread pool executor that keeps tasks of the same key in order, tasks
+        with different keys run concurrently on worker threads
+        :param max_pending: int, max tasks waiting in queue for each key
+        :param on_done: callable (or None), called with key after every task
+        :param logger: Logger (or None), error output
+        """
+        self.max_pending = max_pending
+        self.logger = logger
+        self.__on_done = on_done
+        self.__lanes = {}
+        self.__unbounded = {}
+        self.__lock = threading.Lock()
+        self.__run_queue = queue.Queue()
+
+    def __len__(self):
+        with self.__lock:
+            return sum(len(ele) for ele in self.__lanes.values())
+
+    def pending(self, key):
+        """
+        count tasks of key that are queued or running
+        :param key: hashable
+        :return: int
+        """
+        lane = self.__lanes.get(key)
+        if lane is None:
+            return 0
+        return len(lane)
+
+    def isFull(self, key):
+        """
+        check if queue of key has no room for bounded tasks, unbounded tasks
+        are not counted
+        :param key: hashable
+        :return: bool
+        """
+        return self.pending(key) - self.__unbounded.get(key, 0) >= self.max_pending
+
+    def submit(self, key, func, *args, bounded=True):
+        """
+        submit a task
+        :param key: hashable, tasks of same key are executed in submitting order
+        :param func: callable
+        :param args: arguments of func
+        :param bounded: bool, False to always accept task without counting it
+                        against max_pending, callers must limit these themselves
+        :return: bool, False if queue of key is full
+        """
+        with self.__lock:
+            lane = self.__lanes.get(key)
+            if lane is None:
+                lane = collections.deque()
+                self.__lanes.update({key: lane})
+            elif bounded and len(lane) - self.__unbounded.get(key, 0) >= self.max_pending:
+                return False
+            lane.append((func, args, bounded))
+            if not bounded:
+                self.__unbounded.update({key: self.__unbounded.get(key, 0) + 1})
+            if len(lane) == 1:
+                self.__run_queue.put(key)
+
+        return True
+
+    def work(self, alive, max_wait=0.5):
+        """
+        worker loop, run it in every worker thread until alive() returns False
+        :param alive: callable, returns bool
+        :param max_wait: float, max seconds of waiting between checks of alive()
+        :return: None
+        """
+        while alive():
+            try:
+                key = self.__run_queue.get(timeout=max_wait)
+            except queue.Empty:
+                continue
+
+            func, args, bounded = self.__lanes[key][0]
+            try:
+                func(*args)
+            except Exception as err:
+                if self.logger is not None:
+                    self.logger.ERROR("[executor] task {} failed, {}".format(func, err))
+
+            with self.__lock:
+                lane = self.__lanes[key]
+                lane.popleft()
+                if not bounded:
+                    cnt = self.__unbounded.pop(key) - 1
+                    if cnt:
+                        self.__unbounded.update({key: cnt})
+                if lane:
+                    self.__run_queue.put(key)
+                else:
+                    self.__lanes.pop(key)
+
+            if self.__on_done is not None:
+                self.__on_done(key)
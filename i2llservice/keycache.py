@@ -0,0 +1,270 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: keycache
+# Created on: 2026/10/18
+
+from hashlib import md5
+import threading
+import time
+
+if not __package__:
+    from utils import DEC_TABLE
+else:
+    from .utils import DEC_TABLE
+
+# time slots kept around current one, relative to current slot
+WINDOW = (-1, 0, 1)
+# seconds before a slot starts that its window is precomputed
+LEAD = 5
+# devices refreshed per scheduler callback
+BATCH_SIZE = 500
+
+
+def slotOf(divide=60, timestamp=None):
+    """
+    DynKey16 time slot of a timestamp
+    :param divide: int, slot length in seconds
+    :param timestamp: float (or None), now if None
+    :return: int
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    return int(timestamp / divide)
+
+
+def dynKey16Code(key_unit, slot, divide=60, flush_times=1):
+    """
+    code of DynKey16 for a given time slot, same as DynKey16.keygen() returns
+    while time is in that slot
+    :param key_unit: bytes, md5 digest of DynKey16 key
+    :param slot: int, time slot
+    :param divide: int, slot length in seconds
+    :param flush_times: int
+    :return: bytes, 16 bytes code
+    """
+    sub_key_unit = md5(md5(slot.to_bytes(4, "little", signed=False)).digest() + key_unit).digest()
+    factor = divide % 4 + 1
+
+    for i in range(max(flush_times, 1)):
+        sub_key_unit = list(md5(sub_key_unit).digest()[::-1])
+        conv_core = [(num + (num % 32) // factor) % 255 + 1 for num in sub_key_unit[:3]]
+        c0, c1, c2 = conv_core
+        for i2 in range(3, 14):
+            sub_key_unit[i2] = (sub_key_unit[i2] * c0 + sub_key_unit[i2 + 1] * c1
+                                + sub_key_unit[i2 + 2] * c2) % 256
+        sub_key_unit = md5(bytes(sub_key_unit) + bytes(conv_core) + key_unit).digest()
+
+    return sub_key_unit
+
+
+class DynKeyCache(object):
+
+    def __init__(self, scheduler=None, window=WINDOW, divide=60, lead=LEAD,
+                 batch_size=BATCH_SIZE, logger=None, lookups=None):
+        """
+        codes of DynKey16 generators of all devices indexed by time slot, slots
+        around the next one are precomputed from scheduler thread shortly before
+        it starts and slots that fell out of window are evicted
+        :param scheduler: Scheduler (or None), no background refresh if None
+        :param window: tuple of int, slots kept relative to current slot
+        :param divide: int, slot length used to schedule refreshes
+        :param lead: float, seconds before a slot starts that it is precomputed
+        :param batch_size: int, devices refreshed per scheduler callback
+        :param logger: Logger (or None)
+        :param lookups: Counter (or None), increased by "hit" or "miss" on every lookup
+        """
+        self.window = tuple(window)
+        self.divide = divide
+        self.lead = lead
+        self.batch_size = batch_size
+        self.logger = logger
+        self.lookups = lookups
+        self.hits = 0
+        self.misses = 0
+        self.computed = 0
+        self.last_refresh_duration = None
+        self.live = False
+
+        self.__scheduler = scheduler
+        self.__entries = {}
+        self.__task = None
+        self.__gen = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, owner):
+        return owner in self.__entries
+
+    def add(self, owner, keygen):
+        """
+        register a DynKey16 generator
+        :param owner: hashable, key of device in cache
+        :param keygen: DynKey16
+        :return: None
+        """
+        entry = [md5(keygen.key).digest(), keygen.divide, keygen.flush_time, {}]
+        with self.__lock:
+            self.__entries.update({owner: entry})
+
+    def remove(self, owner):
+        with self.__lock:
+            self.__entries.pop(owner, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def get(self, owner, offset=0, timestamp=None):
+        """
+        get code of a device, computed and kept if it is not cached
+        :param owner: hashable, key of device in cache
+        :param offset: int, slot offset to slot of timestamp
+        :param timestamp: float (or None), now if None
+        :return: bytes (or None), 16 bytes code, None if owner is not in cache
+        """
+        with self.__lock:
+            entry = self.__entries.get(owner)
+        if entry is None:
+            return None
+
+        key_unit, divide, flush_times, codes = entry
+        slot = slotOf(divide, timestamp) + offset
+        code = codes.get(slot)
+        if code is None:
+            self.misses += 1
+            result = "miss"
+            code = dynKey16Code(key_unit, slot, divide, flush_times)
+            codes[slot] = code
+        else:
+            self.hits += 1
+            result = "hit"
+        if self.lookups is not None:
+            self.lookups.inc(result)
+
+        return code
+
+    def getWindow(self, owner, timestamp=None):
+        """
+        get codes of all slots in window
+        :param owner: hashable, key of device in cache
+        :param timestamp: float (or None), now if None
+        :return: dict, {slot offset: code (or None)}
+        """
+        return {offset: self.get(owner, offset, timestamp) for offset in self.window}
+
+    def matchDigits(self, owner, digits, tolerance=1, timestamp=None):
+        """
+        find time slot whose code converts to given keypad digits (see
+        utils.dyn16ToDec), slots nearer to current one are tried first
+        :param owner: hashable, key of device in cache
+        :param digits: list of int (or bytes), keypad digits, 1 to 10 each
+        :param tolerance: int, slots tried before and after current slot
+        :param timestamp: float (or None), now if None
+        :return: int (or None), slot offset of matched code, None if owner is
+                 not in cache
+        """
+        digits = bytes(digits)
+        length = len(digits)
+        for offset in sorted(range(-tolerance, tolerance + 1), key=abs):
+            code = self.get(owner, offset, timestamp)
+            if code is None:
+                return None
+            if code[:length].translate(DEC_TABLE) == digits:
+                return offset
+
+        return None
+
+    def __refreshEntries(self, entries, timestamp):
+        cnt = 0
+        for entry in entries:
+            key_unit, divide, flush_times, codes = entry
+            slot = slotOf(divide, timestamp)
+            oldest = slotOf(divide) + self.window[0]
+            fresh = {key: value for key, value in codes.items() if key >= oldest}
+            for offset in self.window:
+                if slot + offset not in fresh:
+                    fresh[slot + offset] = dynKey16Code(key_unit, slot + offset, divide, flush_times)
+                    cnt += 1
+            # replaced instead of updated so that readers never see it resized
+            entry[3] = fresh
+        self.computed += cnt
+
+        return cnt
+
+    def refresh(self, timestamp=None):
+        """
+        compute window of all devices around slot of timestamp at once and
+        evict slots older than window of current slot
+        :param timestamp: float (or None), now if None
+        :return: int, count of codes computed
+        """
+        with self.__lock:
+            entries = list(self.__entries.values())
+        t0 = time.perf_counter()
+        ret = self.__refreshEntries(entries, timestamp)
+        self.last_refresh_duration = time.perf_counter() - t0
+
+        return ret
+
+    def start(self):
+        """
+        fill window of current slot and start precomputing upcoming slots from
+        scheduler thread
+        :return: DynKeyCache
+        """
+        assert self.__scheduler is not None
+        self.live = True
+        self.refresh()
+        self.__schedule()
+
+        return self
+
+    def stop(self):
+        self.live = False
+        self.__gen += 1
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    def __schedule(self):
+        boundary = (slotOf(self.divide) + 1) * self.divide
+        self.__task = self.__scheduler.callAt(boundary - self.lead, self.__refreshBatch,
+                                              self.__gen, None, 0, boundary, None)
+
+    def __refreshBatch(self, gen, entries, index, boundary, t0):
+        if gen != self.__gen or not self.live:
+            return
+        if t0 is None:
+            t0 = time.perf_counter()
+        if entries is None:
+            with self.__lock:
+                entries = list(self.__entries.values())
+
+        batch = entries[index:index + self.batch_size]
+        try:
+            self.__refreshEntries(batch, boundary)
+        except Exception as err:
+            if self.logger is not None:
+                self.logger.ERROR("[keycache] failed to precompute dynamic keys, {}".format(err))
+
+        index += self.batch_size
+        if index < len(entries):
+            self.__task = self.__scheduler.callLater(0, self.__refreshBatch,
+                                                     gen, entries, index, boundary, t0)
+            return
+
+        self.last_refresh_duration = time.perf_counter() - t0
+        if self.logger is not None:
+            self.logger.DEBUG("[keycache] precomputed dynamic keys of {} device(s) in {:.3f}s",
+                              len(entries), self.last_refresh_duration)
+        # wait for boundary so next refresh targets the slot after it
+        self.__task = self.__scheduler.callAt(boundary, self.__nextRefresh, gen)
+
+    def __nextRefresh(self, gen):
+        if gen != self.__gen or not self.live:
+            return
+        self.__schedule()
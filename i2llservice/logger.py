@@ -0,0 +1,265 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: logger
+# Created on: 2026/10/18
+
+from i2cylib.utils import Logger
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+LEVELS = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3, "CRITICAL": 4}
+
+
+class Hex(object):
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        """
+        bytes wrapper that is converted to hex string only when formatted
+        :param data: bytes
+        """
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex()
+
+
+class RateLimiter(object):
+
+    def __init__(self, rate, burst=None):
+        """
+        token bucket, safe to share between threads
+        :param rate: float, tokens per second
+        :param burst: int (or None), bucket size, defaults to max(1, rate)
+        """
+        if burst is None:
+            burst = max(1, rate)
+        self.rate = rate
+        self.burst = burst
+        self.suppressed = 0
+        self.__tokens = burst
+        self.__t0 = time.time()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        take one token
+        :return: bool, False if message should be dropped
+        """
+        with self.__lock:
+            now = time.time()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__t0) * self.rate)
+            self.__t0 = now
+            if self.__tokens >= 1:
+                self.__tokens -= 1
+                return True
+
+            self.suppressed += 1
+            return False
+
+    def popSuppressed(self):
+        """
+        get and reset count of dropped messages
+        :return: int
+        """
+        with self.__lock:
+            ret = self.suppressed
+            self.suppressed = 0
+            return ret
+
+
+class AsyncLogger(Logger):
+
+    def __init__(self, filename=None, line_end="lf",
+                 date_format="%Y-%m-%d %H:%M:%S", level="DEBUG", echo=True,
+                 max_bytes=0, backup_count=5, rotate_interval=0, queue_size=10000):
+        """
+        Logger that formats messages lazily and writes them from a background
+        thread, with per-category rate limits and log file rotation
+
+        :param filename: str (or None), log filename
+        :param line_end: str, 'lf' or 'crlf'
+        :param date_format: str, time.strftime arguments
+        :param level: str (or int), 'DEBUG' - 0, 'INFO' - 1, 'WARNING' - 2, 'ERROR' - 3, 'CRITICAL' - 4
+        :param echo: bool, print output in terminal
+        :param max_bytes: int, rotate log file when it grows over this size, 0 to disable
+        :param backup_count: int, count of rotated files to keep
+        :param rotate_interval: float, rotate log file every N seconds, 0 to disable
+        :param queue_size: int, max lines waiting to be written, lines over it are dropped
+        """
+        super(AsyncLogger, self).__init__(filename, line_end=line_end, date_format=date_format,
+                                          level=level, echo=echo)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.dropped = 0
+
+        self.__limiters = {}
+        self.__queue = queue.Queue(queue_size)
+        self.__file = None
+        self.__size = 0
+        self.__rotate_t0 = time.time()
+        self.__live = True
+        self.__last_strftime = (0, "")
+        self.__emit_lock = threading.Lock()
+
+        self.__thread = threading.Thread(target=self.__writerThread, daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def setRateLimit(self, category, rate, burst=None):
+        """
+        limit messages of a category
+        :param category: str
+        :param rate: float (or None), messages per second, None to remove limit
+        :param burst: int (or None), messages allowed in a burst
+        :return: None
+        """
+        if rate is None:
+            self.__limiters.pop(category, None)
+        else:
+            self.__limiters.update({category: RateLimiter(rate, burst)})
+
+    def isEnabledFor(self, level):
+        """
+        check if messages of level would be recorded
+        :param level: str (or int)
+        :return: bool
+        """
+        return self.level <= LEVELS.get(level, level)
+
+    def __timestamp(self):
+        now = int(time.time())
+        if self.__last_strftime[0] != now:
+            self.__last_strftime = (now, time.strftime(self.date_format, time.localtime(now)))
+        return self.__last_strftime[1]
+
+    def __log(self, tag, msg, args, category):
+        if category is not None:
+            limiter = self.__limiters.get(category)
+            if limiter is not None:
+                if not limiter.acquire():
+                    return None
+                suppressed = limiter.popSuppressed()
+                if suppressed:
+                    msg = msg + " ({} similar message(s) suppressed)".format(suppressed)
+        if args:
+            msg = msg.format(*args)
+        infos = "[" + self.__timestamp() + "] [" + tag + "] " + msg + self.line_end
+
+        if not self.__live:
+            self.__emit([infos])
+            return infos
+
+        try:
+            self.__queue.put_nowait(infos)
+        except queue.Full:
+            self.dropped += 1
+
+        return infos
+
+    def DEBUG(self, msg, *args, category=None):
+        if self.level > 0:
+            return
+        return self.__log("DBUG", msg, args, category)
+
+    def INFO(self, msg, *args, category=None):
+        if self.level > 1:
+            return
+        return self.__log("INFO", msg, args, category)
+
+    def WARNING(self, msg, *args, category=None):
+        if self.level > 2:
+            return
+        return self.__log("WARN", msg, args, category)
+
+    def ERROR(self, msg, *args, category=None):
+        if self.level > 3:
+            return
+        return self.__log("EROR", msg, args, category)
+
+    def CRITICAL(self, msg, *args, category=None):
+        return self.__log("CRIT", msg, args, category)
+
+    def __rotate(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "{}.{}".format(self.filename, i)
+                if os.path.exists(src):
+                    os.replace(src, "{}.{}".format(self.filename, i + 1))
+            if os.path.exists(self.filename):
+                os.replace(self.filename, "{}.1".format(self.filename))
+        elif os.path.exists(self.filename):
+            os.remove(self.filename)
+
+        self.__rotate_t0 = time.time()
+
+    def __emit(self, lines):
+        with self.__emit_lock:
+            self.__write(lines)
+
+    def __write(self, lines):
+        payload = "".join(lines)
+        if self.echo:
+            sys.stdout.write(payload)
+            sys.stdout.flush()
+        if self.filename is None:
+            return
+
+        if self.rotate_interval > 0 and time.time() - self.__rotate_t0 > self.rotate_interval:
+            self.__rotate()
+        elif 0 < self.max_bytes < self.__size + len(payload) and self.__size:
+            self.__rotate()
+
+        if self.__file is None:
+            self.__file = open(self.filename, "a")
+            self.__size = self.__file.tell()
+        self.__file.write(payload)
+        self.__file.flush()
+        self.__size += len(payload)
+
+    def __writerThread(self):
+        while self.__live or not self.__queue.empty():
+            try:
+                lines = [self.__queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(lines) < 1000:
+                try:
+                    lines.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if self.dropped:
+                lines.append("[{}] [WARN] [logger] {} line(s) dropped, log queue is full{}".format(
+                    self.__timestamp(), self.dropped, self.line_end))
+                self.dropped = 0
+
+            try:
+                self.__emit(lines)
+            except Exception as err:
+                sys.stderr.write("[logger] failed to write log, {}\n".format(err))
+
+    def close(self):
+        """
+        write remaining lines and stop writer thread, lines logged afterwards
+        are written synchronously
+        :return: None
+        """
+        if not self.__live:
+            return
+        self.__live = False
+        self.__thread.join()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
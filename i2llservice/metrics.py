@@ -0,0 +1,380 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: metrics
+# Created on: 2026/10/18
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import bisect
+import threading
+
+
+class Histogram(object):
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                       0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=None):
+        """
+        fixed bucket histogram
+        :param buckets: tuple of float (or None), upper bounds of buckets in ascending order
+        """
+        if buckets is None:
+            buckets = self.DEFAULT_BUCKETS
+        self.buckets = tuple(buckets)
+        self.__counts = [0] * (len(self.buckets) + 1)
+        self.__sum = 0.0
+        self.__count = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return self.__count
+
+    def observe(self, value):
+        """
+        record one sample
+        :param value: float
+        :return: None
+        """
+        i = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            self.__counts[i] += 1
+            self.__sum += value
+            self.__count += 1
+
+    def percentile(self, p):
+        """
+        estimate percentile from buckets (upper bound of the bucket it falls in)
+        :param p: float, 0 ~ 100
+        :return: float (or None if no sample recorded)
+        """
+        with self.__lock:
+            if not self.__count:
+                return None
+            target = self.__count * p / 100
+            cnt = 0
+            for i, ele in enumerate(self.__counts):
+                cnt += ele
+                if cnt >= target and ele:
+                    if i < len(self.buckets):
+                        return self.buckets[i]
+                    return float("inf")
+
+        return float("inf")
+
+    def snapshot(self):
+        """
+        get cumulative bucket counts, sum and count
+        :return: dict
+        """
+        with self.__lock:
+            cumulative = []
+            cnt = 0
+            for ele in self.__counts:
+                cnt += ele
+                cumulative.append(cnt)
+            return {"buckets": list(zip(self.buckets + (float("inf"),), cumulative)),
+                    "sum": self.__sum,
+                    "count": self.__count}
+
+    def reset(self):
+        with self.__lock:
+            self.__counts = [0] * (len(self.buckets) + 1)
+            self.__sum = 0.0
+            self.__count = 0
+
+
+class RunningStats(object):
+
+    def __init__(self):
+        """
+        running count, mean, variance, min, max and last value of samples,
+        without keeping samples in memory
+        """
+        self.count = 0
+        self.last = None
+        self.min = None
+        self.max = None
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.__mean
+
+    @property
+    def stdev(self):
+        if self.count < 2:
+            return None
+        return (self.__m2 / (self.count - 1)) ** 0.5
+
+    def add(self, value):
+        """
+        record one sample
+        :param value: float
+        :return: None
+        """
+        with self.__lock:
+            self.count += 1
+            self.last = value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            delta = value - self.__mean
+            self.__mean += delta / self.count
+            self.__m2 += delta * (value - self.__mean)
+
+    def snapshot(self):
+        """
+        get statistics
+        :return: dict
+        """
+        with self.__lock:
+            return {"count": self.count,
+                    "last": self.last,
+                    "mean": self.mean,
+                    "stdev": self.stdev,
+                    "min": self.min,
+                    "max": self.max}
+
+    def reset(self):
+        with self.__lock:
+            self.count = 0
+            self.last = None
+            self.min = None
+            self.max = None
+            self.__mean = 0.0
+            self.__m2 = 0.0
+
+
+class Counter(object):
+
+    def __init__(self, labels=()):
+        """
+        monotonic counter, optionally split by label values
+        :param labels: tuple of str, label names
+        """
+        self.labels = tuple(labels)
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """
+        increase counter
+        :param label_values: values of labels, in order of label names
+        :param amount: int (or float)
+        :return: None
+        """
+        with self.__lock:
+            self.__values[label_values] = self.__values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.__values.get(label_values, 0)
+
+    def samples(self):
+        """
+        get all values
+        :return: list of tuple (label values, value)
+        """
+        with self.__lock:
+            return list(self.__values.items())
+
+    def reset(self):
+        with self.__lock:
+            self.__values.clear()
+
+
+class Gauge(object):
+
+    def __init__(self, labels=(), callback=None):
+        """
+        value that goes up and down, either set directly or collected by a
+        callback when metrics are read
+        :param labels: tuple of str, label names
+        :param callback: callable (or None), returns a number, or a dict of
+                         {label values tuple: number} if labels are given
+        """
+        self.labels = tuple(labels)
+        self.callback = callback
+        self.__values = {}
+
+    def set(self, value, *label_values):
+        self.__values[label_values] = value
+
+    def get(self, *label_values):
+        return self.__values.get(label_values)
+
+    def samples(self):
+        """
+        get all values
+        :return: list of tuple (label values, value)
+        """
+        if self.callback is None:
+            return list(self.__values.items())
+        ret = self.callback()
+        if isinstance(ret, dict):
+            return list(ret.items())
+        return [((), ret)]
+
+
+def _formatLabels(names, values):
+    pairs = ["{}=\"{}\"".format(name, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+             for name, value in zip(names, values)]
+    if not pairs:
+        return ""
+    return "{" + ",".join(pairs) + "}"
+
+
+def _formatValue(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry(object):
+
+    def __init__(self):
+        """
+        collection of named metrics that renders them in Prometheus text format
+        """
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.__metrics
+
+    def __getitem__(self, name):
+        return self.__metrics[name][2]
+
+    def register(self, name, doc, metric):
+        """
+        add a metric
+        :param name: str, metric name
+        :param doc: str, help text
+        :param metric: Counter, Gauge or Histogram
+        :return: metric
+        """
+        if isinstance(metric, Counter):
+            kind = "counter"
+        elif isinstance(metric, Gauge):
+            kind = "gauge"
+        elif isinstance(metric, Histogram):
+            kind = "histogram"
+        else:
+            raise TypeError("unsupported metric type {}".format(type(metric)))
+
+        with self.__lock:
+            if name in self.__metrics:
+                raise KeyError("metric \"{}\" already registered".format(name))
+            self.__metrics.update({name: (kind, doc, metric)})
+
+        return metric
+
+    def counter(self, name, doc, labels=()):
+        return self.register(name, doc, Counter(labels))
+
+    def gauge(self, name, doc, labels=(), callback=None):
+        return self.register(name, doc, Gauge(labels, callback))
+
+    def histogram(self, name, doc, buckets=None):
+        return self.register(name, doc, Histogram(buckets))
+
+    def unregister(self, name):
+        with self.__lock:
+            self.__metrics.pop(name, None)
+
+    def render(self):
+        """
+        render all metrics in Prometheus text exposition format
+        :return: str
+        """
+        with self.__lock:
+            metrics = sorted(self.__metrics.items())
+
+        lines = []
+        for name, (kind, doc, metric) in metrics:
+            lines.append("# HELP {} {}".format(name, doc))
+            lines.append("# TYPE {} {}".format(name, kind))
+            if kind == "histogram":
+                snapshot = metric.snapshot()
+                for bound, cnt in snapshot["buckets"]:
+                    lines.append("{}_bucket{{le=\"{}\"}} {}".format(name, _formatValue(bound), cnt))
+                lines.append("{}_sum {}".format(name, _formatValue(snapshot["sum"])))
+                lines.append("{}_count {}".format(name, snapshot["count"]))
+                continue
+
+            try:
+                samples = metric.samples()
+            except Exception as err:
+                lines.append("# failed to collect {}, {}".format(name, err))
+                continue
+            for label_values, value in samples:
+                if value is None:
+                    continue
+                lines.append("{}{} {}".format(name, _formatLabels(metric.labels, label_values),
+                                              _formatValue(value)))
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter(object):
+
+    def __init__(self, registry, host="127.0.0.1", port=9421, logger=None):
+        """
+        HTTP server that serves metrics of a registry at /metrics
+        :param registry: Registry
+        :param host: str, listen address
+        :param port: int, listen port
+        :param logger: Logger (or None)
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logger
+        self.__httpd = None
+        self.__thread = None
+
+    def start(self):
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                if exporter.logger is not None:
+                    exporter.logger.DEBUG("[metrics] {} {}", self.address_string(), fmt % args)
+
+        self.__httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.__httpd.daemon_threads = True
+        self.port = self.__httpd.server_address[1]
+        self.__thread = threading.Thread(target=self.__httpd.serve_forever, daemon=True)
+        self.__thread.start()
+        if self.logger is not None:
+            self.logger.INFO("[metrics] serving metrics at http://{}:{}/metrics", self.host, self.port)
+
+    def stop(self):
+        if self.__httpd is None:
+            return
+        self.__httpd.shutdown()
+        self.__httpd.server_close()
+        self.__httpd = None
+        self.__thread = None
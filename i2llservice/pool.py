@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: pool
+# Created on: 2026/10/18
+
+import contextlib
+import threading
+import time
+
+if not __package__:
+    from client import I2LLClient
+    from metrics import Registry
+else:
+    from .client import I2LLClient
+    from .metrics import Registry
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class I2LLClientPool(object):
+
+    def __init__(self, hostname, port=8421, psk="i2tcppsk", size=4,
+                 logger=None, watchdog_timeout=15, max_buffer_size=20,
+                 pipelined=False, connect_timeout=10, registry=None, name=None):
+        """
+        bounded pool of connected I2LLClient, every checked out client is used by
+        one thread at a time so replies can not be taken by another request, and
+        I2TCP handshakes are paid once per connection instead of once per request
+        :param hostname: str, server address
+        :param port: int, server port
+        :param psk: str (or bytes), I2TCP PSK
+        :param size: int, max connections
+        :param logger: Logger (or None)
+        :param watchdog_timeout: int
+        :param max_buffer_size: int, max packages waiting in buffer of each client
+        :param pipelined: bool, use tagged requests on pooled clients
+        :param connect_timeout: int, seconds
+        :param registry: Registry (or None), metrics are registered here
+        :param name: str (or None), metric names are prefixed with
+                     "i2ll_pool_<name>", first pool of a registry uses plain
+                     "i2ll_pool" if None and later ones are numbered
+        """
+        self.hostname = hostname
+        self.port = port
+        self.psk = psk
+        self.size = size
+        self.logger = logger
+        self.watchdog_timeout = watchdog_timeout
+        self.max_buffer_size = max_buffer_size
+        self.pipelined = pipelined
+        self.connect_timeout = connect_timeout
+
+        self.__idle = []
+        self.__in_use = set()
+        self.__opening = 0
+        self.__cond = threading.Condition()
+        self.live = True
+
+        if registry is None:
+            registry = Registry()
+        self.metrics = registry
+        if name is not None:
+            prefix = "i2ll_pool_{}".format(name)
+        else:
+            prefix = "i2ll_pool"
+            cnt = 1
+            while prefix + "_connections" in registry:
+                cnt += 1
+                prefix = "i2ll_pool_{}".format(cnt)
+        self.metric_prefix = prefix
+        self.handshakes = registry.counter(
+            prefix + "_handshakes_total", "I2TCP connections opened by pool")
+        self.handshake_failures = registry.counter(
+            prefix + "_handshake_failures_total", "I2TCP connections pool failed to open")
+        self.discarded = registry.counter(
+            prefix + "_discarded_total", "Pooled connections dropped by health check")
+        self.handshake_latency = registry.histogram(
+            prefix + "_handshake_seconds", "Time spent opening one I2TCP connection")
+        self.wait_latency = registry.histogram(
+            prefix + "_wait_seconds", "Time spent waiting to check out a connection")
+        registry.gauge(
+            prefix + "_connections", "Pooled connections by state", ("state",),
+            callback=lambda: {("idle",): len(self.__idle), ("in_use",): len(self.__in_use)})
+
+    def __len__(self):
+        return len(self.__idle) + len(self.__in_use) + self.__opening
+
+    def isHealthy(self, clt):
+        """
+        check a client before lending it, it must be connected and its watchdog
+        must not have expired, the watchdog counter is reset whenever client
+        sends a package or heartbeat, so it only passes watchdog timeout if
+        writing to server stalls
+        :param clt: I2LLClient
+        :return: bool
+        """
+        return clt.live and clt.connected and clt.watchdog_waitting <= clt.watchdog_timeout
+
+    def __open(self):
+        clt = I2LLClient(self.hostname, port=self.port, psk=self.psk, logger=self.logger,
+                         watchdog_timeout=self.watchdog_timeout,
+                         max_buffer_size=self.max_buffer_size, pipelined=self.pipelined)
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            ok = clt.connect(timeout=self.connect_timeout, auto_reconnect=False)
+        finally:
+            self.handshake_latency.observe(time.perf_counter() - t0)
+            if ok:
+                self.handshakes.inc()
+            else:
+                self.handshake_failures.inc()
+        if not ok:
+            clt.reset()
+            return None
+
+        return clt
+
+    def __discard(self, clt):
+        self.discarded.inc()
+        try:
+            clt.reset()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """
+        check out a connected client, opens a new connection if none is idle
+        and pool is not full
+        :param timeout: float (or None), seconds to wait for a free connection
+        :return: I2LLClient
+        """
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else t0 + timeout
+        stale = []
+        clt = None
+        with self.__cond:
+            while clt is None:
+                if not self.live:
+                    raise ConnectionError("pool closed")
+                while self.__idle:
+                    ele = self.__idle.pop()
+                    if self.isHealthy(ele):
+                        clt = ele
+                        break
+                    stale.append(ele)
+                if clt is not None or len(self) < self.size:
+                    break
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.__cond.wait(remaining)
+
+            if clt is not None:
+                self.__in_use.add(clt)
+            elif len(self) < self.size:
+                self.__opening += 1
+                clt = False
+
+        for ele in stale:
+            self.__discard(ele)
+
+        if clt is None:
+            self.wait_latency.observe(time.perf_counter() - t0)
+            raise PoolTimeout("no free connection in {}s".format(timeout))
+
+        if clt is False:
+            try:
+                clt = self.__open()
+            finally:
+                with self.__cond:
+                    self.__opening -= 1
+                    if clt:
+                        self.__in_use.add(clt)
+                    self.__cond.notify()
+            if clt is None:
+                raise ConnectionError("failed to connect to {}:{}".format(self.hostname, self.port))
+
+        self.wait_latency.observe(time.perf_counter() - t0)
+        return clt
+
+    def release(self, clt, broken=False):
+        """
+        return a checked out client
+        :param clt: I2LLClient
+        :param broken: bool, close connection instead of reusing it
+        :return: None
+        """
+        with self.__cond:
+            self.__in_use.discard(clt)
+            reuse = self.live and not broken and self.isHealthy(clt)
+            if reuse:
+                self.__idle.append(clt)
+            self.__cond.notify()
+        if not reuse:
+            self.__discard(clt)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """
+        check out a client for a with block, connection is closed instead of
+        returned if block raises
+        :param timeout: float (or None), seconds to wait for a free connection
+        :return: I2LLClient
+        """
+        clt = self.acquire(timeout)
+        try:
+            yield clt
+        except Exception:
+            self.release(clt, broken=True)
+            raise
+        self.release(clt)
+
+    def close(self):
+        """
+        close idle connections, clients still checked out are closed when returned
+        :return: None
+        """
+        with self.__cond:
+            self.live = False
+            idle = list(self.__idle)
+            self.__idle.clear()
+            self.__cond.notify_all()
+        for clt in idle:
+            clt.reset()
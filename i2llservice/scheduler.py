@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: scheduler
+# Created on: 2026/10/18
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledTask(object):
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(object):
+
+    def __init__(self, logger=None):
+        """
+        heap based timer scheduler, runs every callback of all devices from
+        one single thread
+        :param logger: Logger (or None), error output
+        """
+        self.logger = logger
+        self.__heap = []
+        self.__seq = itertools.count()
+        self.__cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def callAt(self, deadline, callback, *args):
+        """
+        schedule callback at given timestamp
+        :param deadline: float, time.time() based timestamp
+        :param callback: callable
+        :param args: arguments of callback
+        :return: ScheduledTask
+        """
+        task = ScheduledTask(deadline, callback, args)
+        with self.__cond:
+            heapq.heappush(self.__heap, (deadline, next(self.__seq), task))
+            if self.__heap[0][2] is task:
+                self.__cond.notify()
+
+        return task
+
+    def callLater(self, delay, callback, *args):
+        """
+        schedule callback after given delay
+        :param delay: float, seconds
+        :param callback: callable
+        :param args: arguments of callback
+        :return: ScheduledTask
+        """
+        return self.callAt(time.time() + delay, callback, *args)
+
+    def runPending(self):
+        """
+        run all due callbacks
+        :return: float (or None), seconds until next deadline
+        """
+        while True:
+            with self.__cond:
+                if not self.__heap:
+                    return None
+                deadline, seq, task = self.__heap[0]
+                delay = deadline - time.time()
+                if delay > 0:
+                    return delay
+                heapq.heappop(self.__heap)
+
+            if task.cancelled:
+                continue
+            try:
+                task.callback(*task.args)
+            except Exception as err:
+                if self.logger is not None:
+                    self.logger.ERROR("[scheduler] task {} failed, {}".format(task.callback, err))
+
+    def loop(self, alive, max_wait=0.5):
+        """
+        run scheduler until alive() returns False
+        :param alive: callable, returns bool
+        :param max_wait: float, max seconds of sleeping between checks of alive()
+        :return: None
+        """
+        while alive():
+            delay = self.runPending()
+            with self.__cond:
+                if self.__heap:
+                    delay = self.__heap[0][0] - time.time()
+                if delay is None or delay > max_wait:
+                    delay = max_wait
+                if delay > 0:
+                    self.__cond.wait(delay)
+
+    def clear(self):
+        with self.__cond:
+            self.__heap.clear()
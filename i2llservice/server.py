@@ -10,20 +10,61 @@ from i2cylib.crypto import DynKey16
 from paho.mqtt import client
 from pathlib import Path
 from i2cylib.network.I2TCP import Server, Handler
-from i2cylib.utils import Logger, get_args, DirTree, i2TecHome
+from i2cylib.utils import get_args, DirTree, i2TecHome
 import json
 
 if __name__ == "__main__":
     from config import DeviceConfig, Config
+    from logger import AsyncLogger, Hex
+    from storage import convertStore
+    from topics import TopicIndex, normalizeTopic
+    from scheduler import Scheduler
+    from dispatcher import NotifyingBuffer, ConnectionTable, SerialExecutor
+    from metrics import Histogram, RunningStats, Registry, MetricsExporter
+    from bulk import BulkJob
+    from transport import MqttTransport
+    from keycache import DynKeyCache
+    import codec
 else:
     from .config import DeviceConfig, Config
+    from .logger import AsyncLogger, Hex
+    from .storage import convertStore
+    from .topics import TopicIndex, normalizeTopic
+    from .scheduler import Scheduler
+    from .dispatcher import NotifyingBuffer, ConnectionTable, SerialExecutor
+    from .metrics import Histogram, RunningStats, Registry, MetricsExporter
+    from .bulk import BulkJob
+    from .transport import MqttTransport
+    from .keycache import DynKeyCache
+    from . import codec
 
 import time
 import os
+import queue
 import threading
+import collections
 
 FEEDBACK_TOPIC = "data"
 CMD_TOPIC = "request"
+SUBSCRIBE_BATCH_SIZE = 200
+I2TCP_TAGGED = b"\x7f"
+I2TCP_FAILED = b"\xff"
+ONLINE_UNKNOWN = 0xff
+EVENT_PUSH = b"\xa0"
+EVENT_ONLINE = 0x01
+EVENT_CALIBRATION = 0x02
+EVENT_SKEW = 0x04
+EVENT_DIRECTORY = 0x08
+MAX_CODE_TOLERANCE = 10
+MAX_QUEUED_EVENTS = 256
+EVENT_LABELS = {EVENT_ONLINE: "online", EVENT_CALIBRATION: "calibration", EVENT_SKEW: "skew",
+                EVENT_DIRECTORY: "directory"}
+MAX_CLOCK_SKEW = 15
+TIME_SYNC_MIN_INTERVAL = 5
+TIME_SYNC_GRACE = 5
+SKEW_BUCKETS = (0.5, 1, 2, 5, 10, 15, 30, 60, 300, 3600)
+DECODE_LOG_INTERVAL = 10
+STATE_PERSIST_INTERVAL = 600
 
 SYSTEMD_PATH = "/etc/systemd/system/i2llserver.service"
 NON_ROOT_SYSTEMD_PATH = DirTree(Path.home(), "i2llserver.service")
@@ -69,11 +110,11 @@ class LLMqttClient:
         assert isinstance(device_config, DeviceConfig)
         self.__parent = parent
         self.__client = parent.getMqttClient()
-        assert isinstance(self.__client, client.Client)
+        assert isinstance(self.__client, MqttTransport)
         self.device_config = device_config
-        self.topic_root = self.device_config.root_topic
-        if self.topic_root[-1] == "/":
-            self.topic_root = self.topic_root[:-1]
+        self.topic_root = normalizeTopic(self.device_config.root_topic)
+        self.feedback_topic = self.topic_root + "/" + FEEDBACK_TOPIC
+        self.cmd_topic = self.topic_root + "/" + CMD_TOPIC
 
         self.logger = parent.logger
         self.__log_header = "[MQTT] [{}]".format(self.topic_root)
@@ -84,58 +125,81 @@ class LLMqttClient:
         self.__last_received_flow_cnt = 0
         self.keygen = DynKey16(device_config.dynkey16_psk.encode())
         self.live = True
-
-        threading.Thread(target=self.__onlineWatchdog).start()
+        self.subscribed = False
+
+        self.__scheduler = parent.getScheduler()
+        self.__watchdog_pending = False
+        self.__watchdog_lock = threading.Lock()
+
+        self.skew_stats = RunningStats()
+        self.time_syncs = 0
+        self.__skew_t0 = None
+        self.__last_skew = None
+        self.__state_t0 = 0
+        self.decode_failures = 0
+        self.__decode_unreported = 0
+        self.__decode_report_t0 = 0
+
+        self.__frames_received = parent.frames_received
+        self.__frames_sent = parent.frames_sent
+        self.__skew_histogram = parent.skew_histogram
+
+    @property
+    def last_seen(self):
+        """
+        time of the last valid frame received from device, 0 if never
+        :return: float
+        """
+        return self.__online_wdog_t0
 
     def __onlineWatchdog(self):
-        cnt = 0
-        subscribed = False
-        while self.__parent.live and self.live:
-            if cnt < 20:
-                time.sleep(0.1)
-                cnt += 1
+        # pending flag is only cleared when timer chain ends, so a feed from
+        # paho thread never starts a second chain
+        with self.__watchdog_lock:
+            if not (self.__parent.live and self.live):
+                self.__watchdog_pending = False
+                return
+
+            last = self.is_online
+            self.is_online = time.time() - self.__online_wdog_t0 < self.watchdog_timeout
+            if self.is_online:
+                self.__scheduler.callAt(self.__online_wdog_t0 + self.watchdog_timeout,
+                                        self.__onlineWatchdog)
             else:
-                if not subscribed and self.__client.is_connected():
-                    try:
-                        self.__client.subscribe(self.topic_root + "/" + FEEDBACK_TOPIC)
-                        self.logger.INFO("{} feedback topic \"{}\" subscribed".format(
-                            self.__log_header, self.topic_root + "/" + FEEDBACK_TOPIC))
-                        subscribed = True
-                    except Exception as err:
-                        self.logger.ERROR("{} failed to subscribe topic, {}".format(self.__log_header, err))
-
-                if subscribed:
-                    subscribed = self.__client.is_connected()
-                last = self.is_online
-                self.is_online = time.time() - self.__online_wdog_t0 < self.watchdog_timeout
-                if last != self.is_online:
-                    if self.is_online:
-                        self.logger.INFO("{} device is now online".format(
-                            self.__log_header))
-                    else:
-                        self.logger.WARNING("{} device is now offline".format(
-                            self.__log_header))
-
-                cnt = 0
-                time.sleep(0.1)
+                self.__watchdog_pending = False
+
+        if last != self.is_online:
+            self.saveState()
+            if self.is_online:
+                self.logger.INFO("{} device is now online".format(
+                    self.__log_header))
+            else:
+                self.logger.WARNING("{} device is now offline".format(
+                    self.__log_header))
+            self.__parent.publishEvent(EVENT_ONLINE, self.topic_root, int(self.is_online))
 
     def __feedWatchdog(self):
-        self.__online_wdog_t0 = time.time()
+        with self.__watchdog_lock:
+            self.__online_wdog_t0 = time.time()
+            if not self.__watchdog_pending:
+                self.__watchdog_pending = True
+                self.__scheduler.callLater(0, self.__onlineWatchdog)
+
+    def __nextFlowCount(self):
+        ret = self.__flow_cnt
+        self.__flow_cnt = (ret + 1) & 0xff
+        return ret
 
     def __encodePackage(self, cmd_id, payload):
         status = False
         data = b""
         try:
-            data += bytes((self.__flow_cnt,))
-            self.__flow_cnt += 1
-            data += bytes((cmd_id,))
-            data += int(len(payload)).to_bytes(2, "big", signed=False)
-            data += payload
-            data += bytes((sum(data) % 256,))
+            data = codec.encode(self.__nextFlowCount(), cmd_id, payload)
             status = True
-        except Exception as err:
-            self.logger.WARNING("{} [decoder] failed to encode package, {}, raw hex: {}".format(
-                self.__log_header, err, data.hex()))
+            self.__frames_sent.inc(codec.CMD_LABELS[cmd_id])
+        except (codec.FrameError, ValueError, TypeError) as err:
+            self.logger.WARNING("{} [encoder] failed to encode package, {}, payload hex: {}",
+                                self.__log_header, err, Hex(bytes(payload)))
 
         return status, data
 
@@ -144,104 +208,174 @@ class LLMqttClient:
         cmd_id = 0
         payload = b""
         try:
-            self.__last_received_flow_cnt = data[0]
-            cmd_id = data[1]
-            length = int().from_bytes(data[2:4], "big", signed=False)
-            payload = data[4:4 + length]
-
-            check_sum = sum(data[0:-1]) % 256
-            status = check_sum == data[-1]
-
-        except Exception as err:
-            self.logger.WARNING("{} [decoder] failed to decode package, {}, raw hex: {}".format(
-                self.__log_header, err, data.hex()))
+            self.__last_received_flow_cnt, cmd_id, payload = codec.decode(data)
+            status = True
+        except codec.FrameError as err:
+            if isinstance(err, codec.ChecksumError):
+                self.__parent.checksum_failures.inc()
+            else:
+                self.__parent.malformed_frames.inc()
+            # failures of one device are summarized at most once per DECODE_LOG_INTERVAL
+            self.decode_failures += 1
+            self.__decode_unreported += 1
+            now = time.time()
+            if now - self.__decode_report_t0 >= DECODE_LOG_INTERVAL:
+                self.logger.WARNING("{} [decoder] failed to decode {} package(s) since last report "
+                                    "({} in total), last one {}, raw hex: {}",
+                                    self.__log_header, self.__decode_unreported, self.decode_failures,
+                                    err, Hex(data), category="mqtt_decode")
+                self.__decode_unreported = 0
+                self.__decode_report_t0 = now
 
         return status, cmd_id, payload
 
     def messageHandler(self, msg):
-        if len(self.topic_root) > len(msg.topic) or self.topic_root != msg.topic[:len(self.topic_root)]:
-            return
-
-        self.logger.DEBUG("{} [handler] received message: {}".format(self.__log_header, msg.payload.hex()))
+        # messages are routed to this handler by LLServer topic index
+        self.logger.DEBUG("{} [handler] received message: {}", self.__log_header, Hex(msg.payload),
+                          category="mqtt_rx")
 
         status, cmd_id, payload = self.__decodePackage(msg.payload)
 
         if status:
+            self.__frames_received.inc(codec.CMD_LABELS[cmd_id])
             self.__feedWatchdog()
 
-            if cmd_id == 0x00:  # heartbeat
+            if cmd_id == codec.CMD_HEARTBEAT:  # heartbeat
                 self.__deviceTimeCheck(payload)
 
-            elif cmd_id == 0x01:  # time calibration
+            elif cmd_id == codec.CMD_TIME_REQUEST:  # time calibration
                 self.caliDeviceTime()
 
-            elif cmd_id == 0x02:  # request configuration
+            elif cmd_id == codec.CMD_CONFIG_REQUEST:  # request configuration
                 self.configurateDevice()
 
-            elif cmd_id == 0x30:  # calibration data
+            elif cmd_id == codec.CMD_CALIBRATION_DATA:  # calibration data
                 self.__storageOffset(payload)
                 self.sendOkFlag()
 
-            elif cmd_id == 0xff:  # ok flag from device
+            elif cmd_id == codec.CMD_DEVICE_OK:  # ok flag from device
                 pass
 
     def __storageOffset(self, feedback_payload):
         offset = int().from_bytes(feedback_payload, "little", signed=False)
         self.logger.INFO("{} motor calibrated, offset: {}".format(self.__log_header, offset))
         self.device_config.storage["motor_offset"] = offset
+        self.device_config.saveStorage()
+        self.__parent.publishEvent(EVENT_CALIBRATION, self.topic_root, offset)
+
+    def saveState(self):
+        """
+        save last_seen and clock skew of device into its config, last_seen
+        changes with every frame so it is only saved when device goes online
+        or offline, at most once per STATE_PERSIST_INTERVAL while online and
+        on server shutdown
+        :return: None
+        """
+        self.__state_t0 = time.time()
+        state = {"last_seen": int(self.__online_wdog_t0)}
+        if self.__last_skew is not None:
+            state.update({"clock_skew": self.__last_skew})
+        self.device_config.updateState(**state)
 
     def __deviceTimeCheck(self, feedback_payload):
         now = time.time()
         feedback = int().from_bytes(feedback_payload, "little", signed=False)
-        if abs(now - feedback) > 15:
-            self.logger.INFO("{} device time {}, is not synchronised with server, real time now {}".format(
-                self.__log_header, feedback, int(now)
-            ))
+        skew = feedback - now
+        self.skew_stats.add(skew)
+        self.__skew_histogram.observe(abs(skew))
+        self.__last_skew = int(skew)
+        if now - self.__state_t0 >= STATE_PERSIST_INTERVAL:
+            self.saveState()
+        if abs(skew) <= MAX_CLOCK_SKEW:
+            if self.__skew_t0 is not None:
+                self.__parent.publishEvent(EVENT_SKEW, self.topic_root, int(skew))
+            self.__skew_t0 = None
+            return
+
+        self.logger.INFO("{} device time {}, is not synchronised with server, real time now {}",
+                         self.__log_header, feedback, int(now))
+        if self.__skew_t0 is None:
+            self.__skew_t0 = now
+            self.__parent.publishEvent(EVENT_SKEW, self.topic_root, int(skew))
+
+        # wait for a broadcast time sync first, fall back to calibrating this
+        # device alone if it is still not synchronised after one was sent
+        last_broadcast = self.__parent.last_time_broadcast
+        if not self.__parent.requestTimeSync() or \
+                (last_broadcast > self.__skew_t0 and now - last_broadcast > TIME_SYNC_GRACE):
+            self.__skew_t0 = now
+            self.time_syncs += 1
             self.caliDeviceTime()
 
     def sendOkFlag(self):
-        status, data = self.__encodePackage(0xee, int(time.time()).to_bytes(4, "big", signed=True))
+        status, data = self.__encodePackage(codec.CMD_OK, codec.INT32_BE.pack(int(time.time())))
         if status:
-            self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-            self.logger.DEBUG("{} [cmd] sending ok flag".format(self.__log_header))
+            self.__client.publish(self.cmd_topic, data)
+            self.logger.DEBUG("{} [cmd] sending ok flag", self.__log_header)
 
     def caliDeviceTime(self):
-        status, data = self.__encodePackage(0x11, int(time.time()).to_bytes(4, "little", signed=True))
+        status, data = self.__encodePackage(codec.CMD_TIME_CALIBRATION,
+                                            codec.INT32_LE.pack(int(time.time())))
         if status:
-            self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-            self.logger.DEBUG("{} [cmd] requesting time calibration".format(self.__log_header))
+            self.__client.publish(self.cmd_topic, data)
+            self.logger.DEBUG("{} [cmd] requesting time calibration", self.__log_header)
 
     def configurateDevice(self):
-        status, data = self.__encodePackage(0x12,
-                                            int(self.device_config.storage["motor_offset"]).to_bytes(4, "little",
-                                                                                                     signed=True))
+        status, data = self.__encodePackage(codec.CMD_CONFIGURATION,
+                                            codec.INT32_LE.pack(int(self.device_config.storage["motor_offset"])))
         if status:
-            self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-            self.logger.DEBUG("{} [cmd] configuring device".format(self.__log_header))
+            self.__client.publish(self.cmd_topic, data)
+            self.logger.DEBUG("{} [cmd] configuring device", self.__log_header)
 
     def caliMotorOffset(self):
-        status, data = self.__encodePackage(0x13, int(time.time()).to_bytes(4, "little", signed=True))
+        status, data = self.__encodePackage(codec.CMD_MOTOR_CALIBRATION,
+                                            codec.INT32_LE.pack(int(time.time())))
 
         if status:
-            self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-            self.logger.DEBUG("{} [cmd] calibrating motor offset".format(self.__log_header))
+            self.__client.publish(self.cmd_topic, data)
+            self.logger.DEBUG("{} [cmd] calibrating motor offset", self.__log_header)
 
     def unlock(self):
         if self.is_online:
-            status, data = self.__encodePackage(0x20, int(time.time()).to_bytes(4, "little", signed=True))
+            status, data = self.__encodePackage(codec.CMD_UNLOCK,
+                                                codec.INT32_LE.pack(int(time.time())))
 
             if status:
-                self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-                self.logger.DEBUG("{} [cmd] requesting unlock remotely".format(self.__log_header))
+                self.__client.publish(self.cmd_topic, data)
+                self.logger.DEBUG("{} [cmd] requesting unlock remotely", self.__log_header)
+
+        code = self.__parent.key_cache.get(self)
+        if code is None:
+            code = self.keygen.keygen()
 
-        return self.keygen.keygen()
+        return code
 
     def ringMotor(self):
-        status, data = self.__encodePackage(0x21, int(time.time()).to_bytes(4, "little", signed=True))
+        status, data = self.__encodePackage(codec.CMD_RING,
+                                            codec.INT32_LE.pack(int(time.time())))
 
         if status:
-            self.__client.publish(self.topic_root + "/" + CMD_TOPIC, data)
-            self.logger.DEBUG("{} [cmd] requesting motor ringing".format(self.__log_header))
+            self.__client.publish(self.cmd_topic, data)
+            self.logger.DEBUG("{} [cmd] requesting motor ringing", self.__log_header)
+
+    def sendTemplate(self, template):
+        """
+        publish a copy of an encoded frame with flow counter of this device
+        :param template: bytes, encoded frame
+        :return: bool, succeed
+        """
+        data = bytearray(template)
+        codec.patchFlowCounter(data, self.__nextFlowCount())
+        info = self.__client.publish(self.cmd_topic, data)
+        if info.rc != client.MQTT_ERR_SUCCESS:
+            self.logger.DEBUG("{} [cmd] failed to send command 0x{:02x} in bulk, rc {}",
+                              self.__log_header, data[1], info.rc)
+            return False
+
+        self.__frames_sent.inc(codec.CMD_LABELS[data[1]])
+        self.logger.DEBUG("{} [cmd] sending command 0x{:02x} in bulk", self.__log_header, data[1])
+
+        return True
 
 
 class LLServer(Server):
@@ -249,30 +383,123 @@ class LLServer(Server):
     def __init__(self, config,
                  max_connections=20,
                  secured_connection=True, max_buffer_size=50,
-                 watchdog_timeout=20, verbose=True):
+                 watchdog_timeout=20, verbose=True,
+                 command_workers=None, max_pending_commands=32, transport=None):
         assert isinstance(config, Config)
 
         self.config = config
         self.__mqtt_flag_dict = PahoMqttSessionFlags()
-        logger = Logger(config.log_file, level=config.log_level, echo=verbose)
+        logger = AsyncLogger(config.log_file, level=config.log_level, echo=verbose,
+                             max_bytes=config.log_max_bytes, backup_count=config.log_backup_count,
+                             rotate_interval=config.log_rotate_interval)
+        if config.log_rx_rate:
+            logger.setRateLimit("mqtt_rx", config.log_rx_rate)
+            logger.setRateLimit("mqtt_decode", config.log_rx_rate)
 
         super(LLServer, self).__init__(config.i2tcp_psk.encode("utf-8"), config.i2tcp_port,
                                        max_connections, logger, secured_connection,
                                        max_buffer_size, watchdog_timeout)
-        self.__client = client.Client(self.config.mqtt_client_id)
+        self.__i2tcp_ready = queue.Queue()
+        self.connections = ConnectionTable(lambda: self.__i2tcp_ready.put(None))
+        self.__initMetrics()
+        if command_workers is None:
+            command_workers = config.i2tcp_workers
+        self.command_workers = command_workers
+        self.__executor = None
+        self.__throttled = set()
+        self.__event_subscribers = {}
+        self.__outboxes = {}
+        self.__event_lock = threading.Lock()
+        if command_workers > 0:
+            self.__executor = SerialExecutor(max_pending_commands, self.__onCommandDone, self.logger)
+
+        if transport is None:
+            transport = client.Client(self.config.mqtt_client_id)
+        assert isinstance(transport, MqttTransport)
+        self.__client = transport
         self.__client.username_pw_set(self.config.mqtt_user, self.config.mqtt_password)
         self.__client.on_connect = self.__onConnect
         self.__client.on_message = self.__onMessage
         self.__client.on_disconnect = self.__onDisconnect
+        self.__client.on_subscribe = self.__onSubscribe
         self.__client.reconnect_delay_set(1, 5)
 
         self.__ll_clients = []
+        self.__topic_index = TopicIndex(FEEDBACK_TOPIC)
+        self.__device_map = {}
+        self.__scheduler = Scheduler(self.logger)
+        self.key_cache = DynKeyCache(self.__scheduler, logger=self.logger, lookups=self.cache_lookups)
+        self.__unsubscribed = set()
+        self.__subscribing = {}
+        self.__subscription_lock = threading.Lock()
+        self.__subscription_t0 = None
+        self.subscription_duration = None
+
+        self.last_time_broadcast = 0
+        self.time_broadcasts = 0
+        self.__time_flow_cnt = 0
+        self.__time_task = None
+        self.__time_gen = 0
+        self.__time_lock = threading.Lock()
 
         self.connection_status = self.__mqtt_flag_dict[255]
 
         self.__flag_mqtt_loop_running = False
         self.__flag_dead = False
 
+    def __initMetrics(self):
+        self.metrics = Registry()
+        self.frames_received = self.metrics.counter(
+            "i2ll_mqtt_frames_received_total", "Valid frames received from devices by command ID", ("cmd",))
+        self.frames_sent = self.metrics.counter(
+            "i2ll_mqtt_frames_sent_total", "Frames sent to devices by command ID", ("cmd",))
+        self.checksum_failures = self.metrics.counter(
+            "i2ll_mqtt_checksum_failures_total", "Frames dropped for checksum mismatch")
+        self.malformed_frames = self.metrics.counter(
+            "i2ll_mqtt_malformed_frames_total", "Frames dropped for being too short or truncated")
+        self.dispatch_latency = self.metrics.histogram(
+            "i2ll_mqtt_dispatch_seconds", "Time spent handling one MQTT message")
+        self.command_latency = self.metrics.histogram(
+            "i2ll_i2tcp_command_seconds", "Time from receiving an I2TCP command to finishing it")
+        self.skew_histogram = self.metrics.histogram(
+            "i2ll_device_clock_skew_seconds", "Absolute clock skew reported in device heartbeats",
+            SKEW_BUCKETS)
+        self.metrics.gauge(
+            "i2ll_devices", "Registered devices", callback=lambda: len(self.__ll_clients))
+        self.metrics.gauge(
+            "i2ll_devices_online", "Devices currently online",
+            callback=lambda: sum(1 for con in self.__ll_clients if con.is_online))
+        self.metrics.gauge(
+            "i2ll_device_last_seen_age_seconds", "Seconds since last valid frame from device",
+            ("device",), callback=self.__lastSeenAges)
+        self.metrics.gauge(
+            "i2ll_mqtt_connected", "Whether MQTT client is connected to broker",
+            callback=lambda: int(self.__client.is_connected()))
+        self.metrics.gauge(
+            "i2ll_time_broadcasts", "Broadcast time sync frames published since start",
+            callback=lambda: self.time_broadcasts)
+        self.metrics.gauge(
+            "i2ll_i2tcp_connections", "Open I2TCP client connections",
+            callback=lambda: sum(1 for ele in list(self.connections.values())
+                                 if ele is not None and ele["handler"].live))
+        self.metrics.gauge(
+            "i2ll_i2tcp_event_subscribers", "I2TCP connections subscribed to device events",
+            callback=lambda: len(self.__event_subscribers))
+        self.cache_lookups = self.metrics.counter(
+            "i2ll_dynkey_cache_lookups_total", "Dynamic key lookups served by cache by result", ("result",))
+        self.code_verifications = self.metrics.counter(
+            "i2ll_code_verifications_total", "Offline unlock codes verified by result", ("result",))
+        self.events_pushed = self.metrics.counter(
+            "i2ll_i2tcp_events_pushed_total", "Device events queued for I2TCP clients", ("event",))
+        self.events_dropped = self.metrics.counter(
+            "i2ll_i2tcp_events_dropped_total", "Device events dropped for a full client queue")
+        self.__metrics_exporter = None
+
+    def __lastSeenAges(self):
+        now = time.time()
+        return {(con.topic_root,): now - con.last_seen
+                for con in self.__ll_clients if con.last_seen}
+
     def __iter__(self):
         return self.__ll_clients
 
@@ -286,111 +513,456 @@ class LLServer(Server):
         self.connection_status = self.__mqtt_flag_dict[rc]
         if self.connection_status.is_connected:
             self.logger.INFO("[MQTT] successfully connected to host")
+            self.__resetSubscriptions()
+            self.__subscribeFeedbacks()
+            self.requestTimeSync()
         else:
             self.logger.ERROR("[MQTT] failed to connect to MQTT server, {}, retrying".format(
                 self.connection_status.status))
 
     def __onMessage(self, clt, userdata, message):
-        self.logger.DEBUG("[MQTT] [receiver] received massage from topic \"{}\"".format(message.topic))
-        for con in self.__ll_clients:
-            assert isinstance(con, LLMqttClient)
+        self.logger.DEBUG("[MQTT] [receiver] received massage from topic \"{}\"", message.topic,
+                          category="mqtt_rx")
+        t0 = time.perf_counter()
+        for con in self.__topic_index.match(message.topic):
             con.messageHandler(message)
+        self.dispatch_latency.observe(time.perf_counter() - t0)
 
     def __onDisconnect(self, clt, userdata, rc):
         self.connection_status = self.__mqtt_flag_dict[rc]
+        self.__resetSubscriptions()
         self.logger.ERROR("[MQTT] unexpectedly disconnected from MQTT server, {}, retrying".format(
             self.connection_status.status))
         # self.__client.reconnect()
 
+    def __attachHandler(self, con):
+        old_buffer = con.package_buffer
+        con.package_buffer = NotifyingBuffer(lambda: self.__i2tcp_ready.put(con))
+        if old_buffer:
+            con.package_buffer.prepend(old_buffer)
+            self.__i2tcp_ready.put(con)
+
+    def __handleCommand(self, con, pkg):
+        con.logger.DEBUG("{} [I2LL] received command: {}", con.log_header, Hex(pkg))
+        if con in self.__outboxes:
+            self.__flushEvents(con)
+
+        if pkg[:1] == I2TCP_TAGGED:
+            # tagged request, reply is prefixed with the same tag
+            if len(pkg) < 4:
+                return
+            tag = pkg[:3]
+            try:
+                ret = self.__processCommand(con, pkg[3:])
+            except Exception:
+                con.send(tag + I2TCP_FAILED)
+                raise
+            if ret is None:
+                ret = I2TCP_FAILED
+            con.send(tag + ret)
+        else:
+            ret = self.__processCommand(con, pkg)
+            if ret is not None:
+                con.send(ret)
+
+    def __processCommand(self, con, pkg):
+        cmd_id = pkg[0]
+        payload = pkg[1:]
+        ret = None
+
+        if cmd_id == 0x01:
+            ret = b"\xf1"
+            ret += json.dumps(self.getAllMqttRootTopics()).encode("utf-8")
+
+        elif cmd_id == 0x10:
+            ret = b"\x01"
+            target_topic = payload.decode("utf-8")
+            clt = self.getDeviceClient(target_topic)
+            if clt is None:
+                ret += b"\x00"
+            elif clt.is_online:
+                ret += b"\x01"
+            else:
+                ret += b"\x00"
+
+        elif cmd_id == 0x12:
+            # online table, one status byte per device
+            if payload:
+                clients = [self.getDeviceClient(ele) for ele in json.loads(payload.decode("utf-8"))]
+                ret = b"\xc1" + len(clients).to_bytes(2, "big") + bytes(
+                    ONLINE_UNKNOWN if clt is None else int(clt.is_online) for clt in clients)
+            else:
+                # all devices, root topics are attached so that table can not be
+                # matched against a stale device list
+                clients = list(self.__ll_clients)
+                ret = b"\xc3" + len(clients).to_bytes(2, "big") + bytes(
+                    int(clt.is_online) for clt in clients) + json.dumps(
+                    [clt.topic_root for clt in clients]).encode("utf-8")
+
+        elif cmd_id == 0x13:
+            # storage table, json dict of storages indexed by root topic
+            if payload:
+                clients = [self.getDeviceClient(ele) for ele in json.loads(payload.decode("utf-8"))]
+            else:
+                clients = self.__ll_clients
+            ret = b"\xc2" + json.dumps({clt.topic_root: clt.device_config.storage
+                                        for clt in clients if clt is not None}).encode("utf-8")
+
+        elif cmd_id == 0x11:
+            target_topic = payload.decode("utf-8")
+            clt = self.getDeviceClient(target_topic)
+            if clt is not None:
+                ret = b"\xe1"
+                ret += json.dumps(clt.device_config.storage).encode("utf-8")
+
+        elif cmd_id == 0x14:
+            # subscribe events, empty mask unsubscribes
+            mask = payload[0] if payload else 0
+            with self.__event_lock:
+                if mask:
+                    self.__event_subscribers.update({con: mask})
+                else:
+                    self.__event_subscribers.pop(con, None)
+                    self.__outboxes.pop(con, None)
+            con.logger.INFO("{} [I2LL] subscribed events 0x{:02x}".format(con.log_header, mask))
+            ret = b"\x01\x01"
+
+        elif cmd_id == 0x20:
+            target_topic = payload.split(b",")[0].decode("utf-8")
+            json_dict = json.loads(payload[payload.index(b",") + 1:].decode("utf-8"))
+            clt = self.getDeviceClient(target_topic)
+            if clt is not None:
+                clt.device_config.storage.update(json_dict)
+                clt.device_config.saveStorage()
+                clt.configurateDevice()
+                ret = b"\x01\x01"
+
+        elif cmd_id == 0x24:
+            # verify offline unlock code, invalid requests are answered with flag 0x02
+            # so that client does not wait for its timeout
+            try:
+                target_topic = payload.split(b",")[0].decode("utf-8")
+                json_dict = json.loads(payload[payload.index(b",") + 1:].decode("utf-8"))
+                offset = self.verifyOfflineCode(target_topic, json_dict["code"],
+                                                json_dict.get("tolerance", 1))
+            except (ValueError, KeyError, TypeError, AttributeError) as err:
+                con.logger.WARNING("{} [I2LL] invalid code verification request, {}".format(
+                    con.log_header, err))
+                offset = False
+            if offset is None:
+                ret = b"\xd4\x00\x00"
+            elif offset is False:
+                ret = b"\xd4\x02\x00"
+            else:
+                ret = b"\xd4\x01" + offset.to_bytes(1, "big", signed=True)
+
+        elif cmd_id == 0x21:
+            target_topic = payload.decode("utf-8")
+            clt = self.getDeviceClient(target_topic)
+            if clt is not None:
+                clt.caliMotorOffset()
+                ret = b"\x01\x01"
+
+        elif cmd_id == 0x22:
+            target_topic = payload.decode("utf-8")
+            clt = self.getDeviceClient(target_topic)
+            if clt is not None:
+                ret = b"\xd2" + clt.unlock()
+
+        elif cmd_id == 0x23:
+            target_topic = payload.decode("utf-8")
+            clt = self.getDeviceClient(target_topic)
+            if clt is not None:
+                clt.ringMotor()
+                ret = b"\x01\x01"
+
+        return ret
+
+    def __executeCommand(self, con, pkg, t0):
+        try:
+            self.__handleCommand(con, pkg)
+        except Exception as err:
+            con.logger.ERROR("{} [I2LL] failed to handle command, {}".format(
+                con.log_header, err))
+        self.command_latency.observe(time.time() - t0)
+
+    def __onCommandDone(self, con):
+        # resume connection that was throttled by a full command queue
+        if con in self.__throttled:
+            self.__throttled.discard(con)
+            self.__i2tcp_ready.put(con)
+
     def __i2tcpHandlerThread(self):
         self.threads.update({"i2tcpHandlerThread": True})
 
-        handlers = []
-        idle = False
-
         while self.live:
-            con = self.get_connection(False)
-            if isinstance(con, Handler):
-                handlers.append(con)
+            try:
+                con = self.__i2tcp_ready.get(timeout=0.5)
+            except queue.Empty:
+                con = None
+
+            if con is None:
+                # new connection placed into connection table
+                new_con = self.get_connection(False)
+                while isinstance(new_con, Handler):
+                    self.__attachHandler(new_con)
+                    new_con = self.get_connection(False)
+                continue
+
+            if self.__executor is None and con in self.__outboxes:
+                # replies and events of a connection are written from one thread
+                self.__flushEvents(con)
+
+            while con.live:
+                if self.__executor is not None and self.__executor.isFull(con):
+                    self.__throttled.add(con)
+                    if self.__executor.isFull(con):
+                        break
+                    self.__throttled.discard(con)
+
+                pkg = con.get()
+                if pkg is None:
+                    break
+                t0 = con.package_buffer.last_timestamp
+                if self.__executor is None:
+                    self.__executeCommand(con, pkg, t0)
+                elif not self.__executor.submit(con, self.__executeCommand, con, pkg, t0):
+                    # lane filled up since it was checked, put command back and
+                    # wait for lane to drain
+                    con.package_buffer.prepend([pkg], t0)
 
-            if idle:
-                time.sleep(0.1)
+        self.threads.update({"i2tcpHandlerThread": False})
 
-            idle = True
-
-            for con in handlers:
-                if con.live:
-                    pkg = con.get()
-                    if pkg is not None:
-                        con.logger.DEBUG("{} [I2LL] received command: {}".format(
-                            con.log_header, pkg.hex()))
-
-                        idle = False
-                        cmd_id = pkg[0]
-                        payload = pkg[1:]
-
-                        if cmd_id == 0x01:
-                            ret = b"\xf1"
-                            ret += json.dumps(self.getAllMqttRootTopics()).encode("utf-8")
-                            con.send(ret)
-
-                        elif cmd_id == 0x10:
-                            ret = b"\x01"
-                            target_topic = payload.decode("utf-8")
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is None:
-                                ret += b"\x00"
-                            elif clt.is_online:
-                                ret += b"\x01"
-                            else:
-                                ret += b"\x00"
-                            con.send(ret)
-
-                        elif cmd_id == 0x11:
-                            ret = b"\xe1"
-                            target_topic = payload.decode("utf-8")
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is not None:
-                                ret += json.dumps(clt.device_config.storage).encode("utf-8")
-                                con.send(ret)
-
-                        elif cmd_id == 0x20:
-                            ret = b"\x01\x01"
-                            target_topic = payload.split(b",")[0].decode("utf-8")
-                            json_dict = json.loads(payload[payload.index(b","):].decode("utf-8"))
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is not None:
-                                clt.device_config.storage.update(json_dict)
-                                clt.configurateDevice()
-                                con.send(ret)
-
-                        elif cmd_id == 0x21:
-                            ret = b"\x01\x01"
-                            target_topic = payload.decode("utf-8")
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is not None:
-                                clt.caliMotorOffset()
-                                con.send(ret)
-
-                        elif cmd_id == 0x22:
-                            ret = b"\xd2"
-                            target_topic = payload.decode("utf-8")
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is not None:
-                                dynkey = clt.unlock()
-                                con.send(ret + dynkey)
-
-                        elif cmd_id == 0x23:
-                            ret = b"\x01\x01"
-                            target_topic = payload.decode("utf-8")
-                            clt = self.getDeviceClient(target_topic)
-                            if clt is not None:
-                                clt.ringMotor()
-                                con.send(ret)
-
-            handlers = [ele for ele in handlers if ele.live]
+    def __i2tcpWorkerThread(self, index):
+        self.threads.update({"i2tcpWorkerThread{}".format(index): True})
+        self.__executor.work(lambda: self.live)
+        self.threads.update({"i2tcpWorkerThread{}".format(index): False})
 
-        self.threads.update({"i2tcpHandlerThread": False})
+    def __schedulerThread(self):
+        self.threads.update({"scheduler": True})
+        self.__scheduler.loop(lambda: self.live)
+        self.__scheduler.clear()
+        self.threads.update({"scheduler": False})
+
+    def __timeBroadcast(self, gen):
+        with self.__time_lock:
+            if gen != self.__time_gen or not self.live:
+                return
+            self.__time_task = None
+            topic = self.config.mqtt_time_topic
+            if not topic:
+                return
+
+            data = codec.encode(self.__time_flow_cnt, codec.CMD_TIME_CALIBRATION,
+                                codec.INT32_LE.pack(int(time.time())))
+            self.__time_flow_cnt = (self.__time_flow_cnt + 1) & 0xff
+            info = self.__client.publish(topic, data)
+            if info.rc == client.MQTT_ERR_SUCCESS:
+                self.last_time_broadcast = time.time()
+                self.time_broadcasts += 1
+                self.frames_sent.inc(codec.CMD_LABELS[codec.CMD_TIME_CALIBRATION])
+                self.logger.DEBUG("[MQTT] [time] broadcast time sync to \"{}\"", topic)
+            else:
+                self.logger.DEBUG("[MQTT] [time] failed to broadcast time sync, {}",
+                                  client.error_string(info.rc))
+
+            self.__time_task = self.__scheduler.callLater(self.config.mqtt_time_interval,
+                                                          self.__timeBroadcast, gen)
+
+    def requestTimeSync(self):
+        """
+        broadcast time sync soon unless one was sent or is due in a few seconds
+        :return: bool, False if broadcast time sync is disabled
+        """
+        if not self.config.mqtt_time_topic:
+            return False
+
+        with self.__time_lock:
+            now = time.time()
+            if now - self.last_time_broadcast < TIME_SYNC_MIN_INTERVAL:
+                return True
+            task = self.__time_task
+            if task is not None:
+                if task.deadline - now < TIME_SYNC_MIN_INTERVAL:
+                    return True
+                task.cancel()
+            self.__time_gen += 1
+            self.__time_task = self.__scheduler.callLater(0, self.__timeBroadcast, self.__time_gen)
+
+        return True
+
+    def publishEvent(self, event, root_topic, value=0):
+        """
+        queue a device event for subscribed I2TCP clients, events are written
+        by the thread that sends replies of each connection, never by caller
+        :param event: int, EVENT_ONLINE, EVENT_CALIBRATION, EVENT_SKEW or EVENT_DIRECTORY
+        :param root_topic: str, root topic of device
+        :param value: int, online flag, motor offset, clock skew in seconds or
+                      1 for device added and 0 for device removed
+        :return: int, count of clients the event is queued for
+        """
+        if not self.__event_subscribers:
+            return 0
+
+        pkg = EVENT_PUSH + bytes((event,)) + codec.INT32_BE.pack(value) + root_topic.encode("utf-8")
+        cnt = 0
+        wake = []
+        with self.__event_lock:
+            for con, mask in list(self.__event_subscribers.items()):
+                if not mask & event:
+                    continue
+                if not con.live:
+                    self.__event_subscribers.pop(con)
+                    self.__outboxes.pop(con, None)
+                    continue
+                outbox = self.__outboxes.get(con)
+                if outbox is None:
+                    outbox = [collections.deque(), False]
+                    self.__outboxes.update({con: outbox})
+                if len(outbox[0]) >= MAX_QUEUED_EVENTS:
+                    outbox[0].popleft()
+                    self.events_dropped.inc()
+                outbox[0].append(pkg)
+                if not outbox[1]:
+                    outbox[1] = True
+                    wake.append(con)
+                cnt += 1
+
+        for con in wake:
+            if self.__executor is None:
+                self.__i2tcp_ready.put(con)
+            else:
+                # at most one flush per connection is queued (see outbox flag), so
+                # it does not take room of commands in lane
+                self.__executor.submit(con, self.__flushEvents, con, bounded=False)
+        self.events_pushed.inc(EVENT_LABELS[event], amount=cnt)
+
+        return cnt
+
+    def __flushEvents(self, con):
+        # only called from the thread that writes replies of this connection
+        with self.__event_lock:
+            outbox = self.__outboxes.get(con)
+            if outbox is None:
+                return
+            pending = list(outbox[0])
+            outbox[0].clear()
+            outbox[1] = False
+
+        for pkg in pending:
+            try:
+                if not con.live:
+                    raise ConnectionError("connection closed")
+                con.send(pkg)
+            except Exception as err:
+                con.logger.DEBUG("{} [I2LL] dropped event subscription, {}", con.log_header, err)
+                with self.__event_lock:
+                    self.__event_subscribers.pop(con, None)
+                    self.__outboxes.pop(con, None)
+                return
+
+    def verifyOfflineCode(self, root_topic, code, tolerance=1, timestamp=None):
+        """
+        check keypad digits typed by a user against offline unlock codes of a
+        device within a tolerance of time slots
+        :param root_topic: str, root topic of device
+        :param code: list of int (or str), keypad digits, 1 to 10 each, a str
+                     is read as one digit per character
+        :param tolerance: int, time slots allowed before or after current one
+        :param timestamp: float (or None), time code was typed, now if None
+        :return: int (or None), slot offset of matched code, None if not matched
+        """
+        if isinstance(code, str):
+            code = [int(ele) for ele in code]
+        if not 0 < len(code) <= 16 or not all(0 < ele <= 10 for ele in code):
+            raise ValueError("code must be 1 to 16 digits of 1 to 10")
+        if not 0 <= tolerance <= MAX_CODE_TOLERANCE:
+            raise ValueError("tolerance must be 0 to {}".format(MAX_CODE_TOLERANCE))
+
+        con = self.getDeviceClient(root_topic)
+        if con is None:
+            raise ValueError("unknown device \"{}\"".format(root_topic))
+        if con not in self.key_cache:
+            self.key_cache.add(con, con.keygen)
+        offset = self.key_cache.matchDigits(con, code, tolerance, timestamp)
+
+        self.code_verifications.inc("failed" if offset is None else "matched")
+        self.logger.DEBUG("[I2LL] [{}] offline code verification {}, slot offset {}",
+                          con.topic_root, "failed" if offset is None else "matched", offset)
+
+        return offset
+
+    def getSkewStatistics(self):
+        """
+        get clock skew statistics of all devices
+        :return: dict, {root topic: statistics dict}
+        """
+        return {con.topic_root: dict(con.skew_stats.snapshot(), time_syncs=con.time_syncs)
+                for con in self.__ll_clients}
+
+    def __resetSubscriptions(self):
+        with self.__subscription_lock:
+            for con in self.__ll_clients:
+                con.subscribed = False
+            self.__subscribing.clear()
+            self.__unsubscribed.update(self.__ll_clients)
+            self.__subscription_t0 = None
+
+    def __subscribeFeedbacks(self):
+        with self.__subscription_lock:
+            if not self.__unsubscribed:
+                return
+            if self.__subscription_t0 is None:
+                self.__subscription_t0 = time.time()
+
+            pending = list(self.__unsubscribed)
+            for i in range(0, len(pending), SUBSCRIBE_BATCH_SIZE):
+                batch = pending[i:i + SUBSCRIBE_BATCH_SIZE]
+                try:
+                    rc, mid = self.__client.subscribe([(con.feedback_topic, 0) for con in batch])
+                except Exception as err:
+                    self.logger.ERROR("[MQTT] failed to subscribe feedback topics, {}".format(err))
+                    break
+                if rc != client.MQTT_ERR_SUCCESS:
+                    self.logger.ERROR("[MQTT] failed to subscribe feedback topics, {}".format(
+                        client.error_string(rc)))
+                    break
+                self.__subscribing.update({mid: batch})
+                self.__unsubscribed.difference_update(batch)
+
+            self.logger.DEBUG("[MQTT] {} feedback topic(s) waiting for SUBACK in {} batch(es)".format(
+                sum(len(ele) for ele in self.__subscribing.values()), len(self.__subscribing)))
+
+    def __onSubscribe(self, clt, userdata, mid, granted_qos):
+        with self.__subscription_lock:
+            batch = self.__subscribing.pop(mid, None)
+            if batch is None:
+                return
+
+            for con, qos in zip(batch, granted_qos):
+                if qos > 2:
+                    self.__unsubscribed.add(con)
+                    self.logger.ERROR("[MQTT] [{}] failed to subscribe feedback topic, rejected by server".format(
+                        con.topic_root))
+                elif con.live:
+                    con.subscribed = True
+                    self.logger.DEBUG("[MQTT] [{}] feedback topic \"{}\" subscribed".format(
+                        con.topic_root, con.feedback_topic))
+
+            if not self.__subscribing and not self.__unsubscribed and self.__subscription_t0 is not None:
+                self.subscription_duration = time.time() - self.__subscription_t0
+                self.__subscription_t0 = None
+                self.logger.INFO("[MQTT] all {} feedback topic(s) subscribed in {:.3f}s".format(
+                    len(self.__ll_clients), self.subscription_duration))
+
+    def __subscriptionWatchdog(self):
+        if not self.live:
+            return
+
+        if self.__unsubscribed and self.__client.is_connected():
+            self.__subscribeFeedbacks()
+
+        self.__scheduler.callLater(2, self.__subscriptionWatchdog)
 
     def __autoReconnectThread(self):
         self.threads.update({"mqttClientAutoReconnect": True})
@@ -423,18 +995,102 @@ class LLServer(Server):
             raise Exception("dead LL server")
         super(LLServer, self).start(port)
 
-        threading.Thread(target=self.__autoReconnectThread).start()
+        threading.Thread(target=self.__schedulerThread).start()
+        self.__scheduler.callLater(2, self.__subscriptionWatchdog)
+        self.requestTimeSync()
         for device in self.config:
-            self.__ll_clients.append(LLMqttClient(self, device))
+            self.addDeviceClient(device)
+        self.key_cache.start()
+        threading.Thread(target=self.__autoReconnectThread).start()
         threading.Thread(target=self.__i2tcpHandlerThread).start()
+        for i in range(self.command_workers):
+            threading.Thread(target=self.__i2tcpWorkerThread, args=(i,)).start()
+        if self.config.metrics_port:
+            try:
+                self.__metrics_exporter = MetricsExporter(self.metrics, self.config.metrics_host,
+                                                          self.config.metrics_port, self.logger)
+                self.__metrics_exporter.start()
+            except Exception as err:
+                self.__metrics_exporter = None
+                self.logger.ERROR("[metrics] failed to start metrics exporter, {}", err)
 
     def kill(self):
+        if self.__metrics_exporter is not None:
+            self.__metrics_exporter.stop()
+            self.__metrics_exporter = None
+        self.key_cache.stop()
         super(LLServer, self).kill()
+        for con in self.__ll_clients:
+            if con.last_seen:
+                con.saveState()
+        self.config.flush()
         self.__ll_clients.clear()
+        self.__topic_index.clear()
+        self.__device_map.clear()
+        self.key_cache.clear()
+        self.__unsubscribed.clear()
+        self.__throttled.clear()
+        self.__event_subscribers.clear()
+        self.__outboxes.clear()
+        self.logger.close()
+
+    def addDeviceClient(self, device_config):
+        """
+        create MQTT client of device and register it into message dispatcher
+        :param device_config: DeviceConfig
+        :return: LLMqttClient
+        """
+        con = LLMqttClient(self, device_config)
+        self.__ll_clients.append(con)
+        self.__topic_index.add(con.topic_root, con)
+        self.__device_map.setdefault(con.topic_root, con)
+        self.key_cache.add(con, con.keygen)
+        with self.__subscription_lock:
+            self.__unsubscribed.add(con)
+        if self.__client.is_connected():
+            self.__subscribeFeedbacks()
+        self.publishEvent(EVENT_DIRECTORY, con.topic_root, 1)
+
+        return con
+
+    def removeDeviceClient(self, con):
+        """
+        stop MQTT client of device and remove it from message dispatcher
+        :param con: LLMqttClient
+        :return: bool, succeed
+        """
+        if con not in self.__ll_clients:
+            return False
+
+        con.live = False
+        self.__topic_index.remove(con.topic_root, con)
+        self.key_cache.remove(con)
+        if self.__device_map.get(con.topic_root) is con:
+            self.__device_map.pop(con.topic_root)
+            for ele in self.__ll_clients:
+                if ele is not con and ele.topic_root == con.topic_root:
+                    self.__device_map.update({ele.topic_root: ele})
+                    break
+        with self.__subscription_lock:
+            self.__unsubscribed.discard(con)
+        if con.subscribed:
+            try:
+                self.__client.unsubscribe(con.feedback_topic)
+            except Exception as err:
+                self.logger.ERROR("[MQTT] [{}] failed to unsubscribe feedback topic, {}".format(
+                    con.topic_root, err))
+        self.__ll_clients.remove(con)
+        if con.topic_root not in self.__device_map:
+            self.publishEvent(EVENT_DIRECTORY, con.topic_root, 0)
+
+        return True
 
     def getMqttClient(self):
         return self.__client
 
+    def getScheduler(self):
+        return self.__scheduler
+
     def getAllMqttRootTopics(self):
         ret = []
         for con in self.__ll_clients:
@@ -443,32 +1099,75 @@ class LLServer(Server):
 
         return ret
 
-    def getDeviceClient(self, root_topic):
-        con: (LLMqttClient, None)
+    def getDeviceClient(self, root_topic, prefix=False):
+        """
+        get MQTT client of device by its root topic
+        :param root_topic: str, root topic of device (trailing slash ignored)
+        :param prefix: bool, fall back to the device with the longest root
+                       topic that covers given topic if no exact match found
+        :return: LLMqttClient (or None)
+        """
+        root_topic = normalizeTopic(root_topic)
+        ret = self.__device_map.get(root_topic)
+
+        if ret is None and prefix:
+            matched = self.__topic_index.match(root_topic)
+            if matched:
+                ret = max(matched, key=lambda ele: len(ele.topic_root))
 
-        for con in self.__ll_clients:
-            assert isinstance(con, LLMqttClient)
-            if con.topic_root in root_topic:
-                return con
+        return ret
+
+    def bulkCommand(self, cmd_id, device_filter=None, rate=None, online_only=False):
+        """
+        send one command to all devices matching a filter, frames are published
+        in paced batches from scheduler thread
+        :param cmd_id: int, one of bulk.BULK_COMMANDS
+        :param device_filter: callable (or None), takes LLMqttClient and returns bool
+        :param rate: float (or None), max frames per second, defaults to config.mqtt_bulk_rate
+        :param online_only: bool, skip devices that are offline
+        :return: BulkJob
+        """
+        if rate is None:
+            rate = self.config.mqtt_bulk_rate
+        targets = [con for con in self.__ll_clients
+                   if (not online_only or con.is_online)
+                   and (device_filter is None or device_filter(con))]
+
+        return BulkJob(self.__scheduler, targets, cmd_id, rate, logger=self.logger).start()
+
+    def caliAllDeviceTime(self, device_filter=None, rate=None, online_only=False):
+        return self.bulkCommand(codec.CMD_TIME_CALIBRATION, device_filter, rate, online_only)
+
+    def caliAllMotorOffset(self, device_filter=None, rate=None, online_only=True):
+        return self.bulkCommand(codec.CMD_MOTOR_CALIBRATION, device_filter, rate, online_only)
+
+    def ringAllMotor(self, device_filter=None, rate=None, online_only=True):
+        return self.bulkCommand(codec.CMD_RING, device_filter, rate, online_only)
 
 
 def manual():
     print("""ESP32-S3 Locking Lock Cloud Service
     
-    i2llserver [setup/config/init] [-c] [-v] [-h]
+    i2llserver [setup/config/init] [import/export FILE] [-c] [-v] [-h]
     
     Usage:
-        -c --config             - set config path
+        -c --config             - set config path (*.db, *.sqlite or *.sqlite3
+                                  for SQLite storage, JSON for others)
 
         -v --verbose            - print log in stdio
 
         -h --help               - show this page
         
         setup config init       - initiate server with guidance
+
+        import FILE             - replace config with the one in FILE
+
+        export FILE             - copy config into FILE
     
     Examples:
     > i2llsrv init
     > i2llsrv -c $HOME/.i2tec/config.json
+    > i2llsrv -c $HOME/.i2tec/i2ll/config.db import $HOME/.i2tec/i2ll/config.json
     """)
 
 
@@ -480,11 +1179,12 @@ def main():
     config = root.join("config.json")
     init = False
     verb = False
+    convert = None
 
     for opt in args:
         if opt in ("-c", "--config"):
             argv = DirTree(args[opt])
-            if not argv.exists():
+            if not argv.exists() and args.get(0) != "import":
                 print("warning: config \"{}\" dose not exists, falling back to default".format(argv))
             else:
                 config = argv
@@ -500,6 +1200,23 @@ def main():
             argv = args[opt]
             if argv in ("init", "setup", "config"):
                 init = True
+            elif argv in ("import", "export"):
+                convert = argv
+
+    if convert is not None:
+        if 1 not in args:
+            print("error: please specify the file to {}".format(convert))
+            return
+        if convert == "export":
+            src, dst = config, DirTree(args[1])
+        else:
+            src, dst = DirTree(args[1]), config
+        if not src.exists():
+            print("error: config \"{}\" dose not exists".format(src))
+            return
+        cnt = convertStore(src, dst)
+        print("{} device(s) copied from \"{}\" to \"{}\"".format(cnt, src, dst))
+        return
 
     if not config.exists():
         print("no configuration file detected, do you wish to setup server and generate config file?")
@@ -638,6 +1355,39 @@ def main():
             if cin:
                 conf_obj.mqtt_client_id = cin
 
+            fail = True
+            while fail:
+                try:
+                    cin = input("  bulk command rate in frames per second "
+                                "(input nothing for default: {}): ".format(conf_obj.mqtt_bulk_rate))
+                    if cin:
+                        conf_obj.mqtt_bulk_rate = float(cin)
+                        assert conf_obj.mqtt_bulk_rate > 0
+                    fail = False
+                except Exception as err:
+                    print("   error: please input the correct type of value")
+                    fail = True
+
+            cin = input("  broadcast time sync topic, \"none\" to disable "
+                        "(input nothing for default: {}): ".format(conf_obj.mqtt_time_topic or "none"))
+            if cin:
+                if cin.lower() == "none":
+                    cin = ""
+                conf_obj.mqtt_time_topic = cin
+
+            fail = True
+            while fail:
+                try:
+                    cin = input("  broadcast time sync interval in seconds "
+                                "(input nothing for default: {}): ".format(conf_obj.mqtt_time_interval))
+                    if cin:
+                        conf_obj.mqtt_time_interval = float(cin)
+                        assert conf_obj.mqtt_time_interval > 0
+                    fail = False
+                except Exception as err:
+                    print("   error: please input the correct type of value")
+                    fail = True
+
             print(" -> editing I2TCP settings")
             fail = True
             while fail:
@@ -655,6 +1405,36 @@ def main():
             if cin:
                 conf_obj.i2tcp_psk = cin
 
+            fail = True
+            while fail:
+                try:
+                    cin = input("  command worker threads, 0 for handling in sequence "
+                                "(input nothing for default: {}): ".format(conf_obj.i2tcp_workers))
+                    if cin:
+                        conf_obj.i2tcp_workers = int(cin)
+                    fail = False
+                except Exception as err:
+                    print("   error: please input the correct type of value")
+                    fail = True
+
+            print(" -> editing metrics settings")
+            cin = input("  metrics listen address (input nothing for default: {}): ".format(
+                conf_obj.metrics_host))
+            if cin:
+                conf_obj.metrics_host = cin
+
+            fail = True
+            while fail:
+                try:
+                    cin = input("  metrics listen port, 0 to disable "
+                                "(input nothing for default: {}): ".format(conf_obj.metrics_port))
+                    if cin:
+                        conf_obj.metrics_port = int(cin)
+                    fail = False
+                except Exception as err:
+                    print("   error: please input the correct type of value")
+                    fail = True
+
             print(" -> editing logging settings")
             cin = input("  log filename (input nothing for default: {}): ".format(conf_obj.log_file))
             if cin:
@@ -774,6 +1554,8 @@ def main():
         while edit:
             edit = edit_device(conf)
 
+        conf.flush()
+
         print("server is now ready, do you wish to make server auto start when system boot?")
         choice = input("(input Y for yes, others for No): ").upper()
         if choice in ("Y", "YES"):
@@ -0,0 +1,373 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: simulator
+# Created on: 2026/10/18
+
+from paho.mqtt import client
+from i2cylib.utils import get_args
+import random
+import threading
+import time
+
+if __name__ == "__main__":
+    import codec
+    from config import Config
+    from scheduler import Scheduler
+    from topics import normalizeTopic
+else:
+    from . import codec
+    from .config import Config
+    from .scheduler import Scheduler
+    from .topics import normalizeTopic
+
+FEEDBACK_TOPIC = "data"
+CMD_TOPIC = "request"
+SUBSCRIBE_BATCH_SIZE = 200
+
+
+class VirtualLock(object):
+
+    def __init__(self, fleet, root_topic, heartbeat_interval=10, skew=0, drift=0):
+        """
+        emulated ESP32-S3 lock that speaks the MQTT frame protocol of LLMqttClient
+        :param fleet: VirtualFleet
+        :param root_topic: str, root topic of device
+        :param heartbeat_interval: float, seconds between heartbeats
+        :param skew: float, initial offset of device clock in seconds
+        :param drift: float, seconds of clock drift per second
+        """
+        self.fleet = fleet
+        self.root_topic = normalizeTopic(root_topic)
+        self.feedback_topic = self.root_topic + "/" + FEEDBACK_TOPIC
+        self.cmd_topic = self.root_topic + "/" + CMD_TOPIC
+        self.heartbeat_interval = heartbeat_interval
+        self.drift = drift
+        self.motor_offset = None
+
+        self.heartbeats = 0
+        self.received = 0
+        self.errors = 0
+        self.time_syncs = 0
+        self.first_heartbeat = None
+        self.live = False
+
+        self.__offset = skew
+        self.__offset_t0 = time.time()
+        self.__flow_cnt = 0
+        self.__task = None
+
+    def __repr__(self):
+        return "<VirtualLock {}>".format(self.root_topic)
+
+    def clock(self):
+        """
+        current time of device clock
+        :return: float
+        """
+        now = time.time()
+        return now + self.__offset + (now - self.__offset_t0) * self.drift
+
+    def send(self, cmd_id, payload=b""):
+        data = codec.encode(self.__flow_cnt, cmd_id, payload)
+        self.__flow_cnt = (self.__flow_cnt + 1) & 0xff
+        self.fleet.publish(self, data)
+
+    def __heartbeat(self):
+        if not self.live:
+            return
+        now = time.time()
+        if self.first_heartbeat is None:
+            self.first_heartbeat = now
+        self.heartbeats += 1
+        self.send(codec.CMD_HEARTBEAT, codec.UINT32_LE.pack(int(self.clock()) & 0xffffffff))
+        self.__task = self.fleet.scheduler.callAt(now + self.heartbeat_interval, self.__heartbeat)
+
+    def boot(self):
+        """
+        request time and configuration like a freshly powered device, then
+        start heartbeats
+        :return: None
+        """
+        self.live = True
+        self.send(codec.CMD_TIME_REQUEST)
+        self.send(codec.CMD_CONFIG_REQUEST)
+        self.__heartbeat()
+
+    def shutdown(self):
+        self.live = False
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    def syncTime(self, timestamp):
+        """
+        set device clock
+        :param timestamp: int, server time
+        :return: None
+        """
+        self.__offset = timestamp - time.time()
+        self.__offset_t0 = time.time()
+        self.time_syncs += 1
+
+    def handle(self, data):
+        """
+        handle one command frame from server
+        :param data: bytes, frame
+        :return: None
+        """
+        self.received += 1
+        try:
+            flow_cnt, cmd_id, payload = codec.decode(data)
+        except codec.FrameError:
+            self.errors += 1
+            return
+
+        if cmd_id == codec.CMD_TIME_CALIBRATION:
+            self.syncTime(codec.INT32_LE.unpack(payload)[0])
+
+        elif cmd_id == codec.CMD_CONFIGURATION:
+            self.motor_offset = codec.INT32_LE.unpack(payload)[0]
+
+        elif cmd_id == codec.CMD_MOTOR_CALIBRATION:
+            self.motor_offset = random.randint(0, 4095)
+            self.send(codec.CMD_CALIBRATION_DATA, codec.UINT32_LE.pack(self.motor_offset))
+
+        elif cmd_id in (codec.CMD_UNLOCK, codec.CMD_RING):
+            self.send(codec.CMD_DEVICE_OK)
+
+        elif cmd_id == codec.CMD_OK:
+            pass
+
+
+class VirtualFleet(object):
+
+    def __init__(self, host="127.0.0.1", port=1883, user=None, password=None,
+                 connections=1, client_id="I2LL-Simulator", time_topic=None):
+        """
+        group of virtual locks sharing a few MQTT connections
+        :param host: str, MQTT broker address
+        :param port: int, MQTT broker port
+        :param user: str (or None), MQTT username
+        :param password: str (or None), MQTT password
+        :param connections: int, MQTT connections that locks are spread over
+        :param client_id: str, prefix of MQTT client IDs
+        :param time_topic: str (or None), broadcast time sync topic to listen to
+        """
+        self.host = host
+        self.port = port
+        self.time_topic = time_topic
+        self.locks = []
+        self.scheduler = Scheduler()
+        self.sent = 0
+        self.live = False
+
+        self.__clients = []
+        self.__members = []
+        self.__routes = {}
+        self.__thread = None
+        for i in range(max(1, connections)):
+            clt = client.Client("{}-{}-{}".format(client_id, i, random.randint(0, 0xffffff)))
+            if user is not None:
+                clt.username_pw_set(user, password)
+            clt.on_connect = self.__onConnect
+            clt.on_message = self.__onMessage
+            clt.user_data_set(i)
+            self.__clients.append(clt)
+            self.__members.append([])
+
+    def __len__(self):
+        return len(self.locks)
+
+    def __iter__(self):
+        return iter(self.locks)
+
+    def addLock(self, root_topic, heartbeat_interval=10, skew=0, drift=0):
+        """
+        add a virtual lock
+        :param root_topic: str
+        :param heartbeat_interval: float, seconds between heartbeats
+        :param skew: float, initial offset of device clock in seconds
+        :param drift: float, seconds of clock drift per second
+        :return: VirtualLock
+        """
+        lock = VirtualLock(self, root_topic, heartbeat_interval, skew, drift)
+        index = len(self.locks) % len(self.__clients)
+        lock.connection = index
+        self.locks.append(lock)
+        self.__members[index].append(lock)
+        self.__routes.update({lock.cmd_topic: lock})
+
+        return lock
+
+    def __onConnect(self, clt, userdata, flags, rc):
+        if rc != 0:
+            return
+        topics = [lock.cmd_topic for lock in self.__members[userdata]]
+        if self.time_topic:
+            topics.append(self.time_topic)
+        for i in range(0, len(topics), SUBSCRIBE_BATCH_SIZE):
+            clt.subscribe([(ele, 0) for ele in topics[i:i + SUBSCRIBE_BATCH_SIZE]])
+
+    def __onMessage(self, clt, userdata, message):
+        lock = self.__routes.get(message.topic)
+        if lock is not None:
+            lock.handle(message.payload)
+            return
+
+        if message.topic == self.time_topic:
+            try:
+                flow_cnt, cmd_id, payload = codec.decode(message.payload)
+            except codec.FrameError:
+                return
+            if cmd_id == codec.CMD_TIME_CALIBRATION:
+                timestamp = codec.INT32_LE.unpack(payload)[0]
+                for lock in self.__members[userdata]:
+                    lock.syncTime(timestamp)
+
+    def publish(self, lock, data):
+        self.__clients[lock.connection].publish(lock.feedback_topic, data)
+        self.sent += 1
+
+    def __schedulerThread(self):
+        self.scheduler.loop(lambda: self.live)
+        self.scheduler.clear()
+
+    def start(self, ramp=None, timeout=10):
+        """
+        connect to broker and boot all locks
+        :param ramp: float (or None), seconds to spread boots over, defaults to
+                     the shortest heartbeat interval
+        :param timeout: float, seconds to wait for connections
+        :return: None
+        """
+        for clt in self.__clients:
+            clt.connect(self.host, self.port)
+            clt.loop_start()
+
+        t0 = time.time()
+        while not all(clt.is_connected() for clt in self.__clients):
+            if time.time() - t0 > timeout:
+                self.stop()
+                raise ConnectionError("failed to connect to MQTT broker {}:{}".format(self.host, self.port))
+            time.sleep(0.05)
+
+        if ramp is None:
+            ramp = min([lock.heartbeat_interval for lock in self.locks] or [0])
+        self.live = True
+        self.__thread = threading.Thread(target=self.__schedulerThread, daemon=True)
+        self.__thread.start()
+        now = time.time()
+        for lock in self.locks:
+            self.scheduler.callAt(now + random.random() * ramp, lock.boot)
+
+    def stop(self):
+        self.live = False
+        for lock in self.locks:
+            lock.shutdown()
+        for clt in self.__clients:
+            clt.disconnect()
+            clt.loop_stop()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def stats(self):
+        """
+        get counters of fleet
+        :return: dict
+        """
+        return {"locks": len(self.locks),
+                "sent": self.sent,
+                "heartbeats": sum(lock.heartbeats for lock in self.locks),
+                "received": sum(lock.received for lock in self.locks),
+                "errors": sum(lock.errors for lock in self.locks),
+                "time_syncs": sum(lock.time_syncs for lock in self.locks)}
+
+
+def manual():
+    print("""LockingLock device fleet simulator
+
+    i2llsim [-c CONFIG] [-n COUNT] [-i INTERVAL] [-s SKEW] [--drift DRIFT] [-t SECONDS] [-h]
+
+    Options:
+     -c --config        - read device root topics and MQTT broker settings from a
+                          server config file
+     -n --count         - number of virtual locks, used when no config is given
+                          (default 100)
+        --prefix        - root topic prefix of virtual locks (default /esp32ll/dev_)
+        --host          - MQTT broker address (default 127.0.0.1)
+        --port          - MQTT broker port (default 1883)
+     -i --interval      - heartbeat interval in seconds (default 10)
+     -s --skew          - max initial clock offset of locks in seconds (default 0)
+        --drift         - max clock drift of locks in seconds per second (default 0)
+        --connections   - MQTT connections to spread locks over (default 1)
+        --time-topic    - broadcast time sync topic to listen to
+     -t --time          - seconds to run, 0 for forever (default 0)
+     -h --help          - display this help
+
+    Examples:
+     i2llsim -c ~/.i2tec/i2ll/config.json -i 5 -s 60
+     i2llsim -n 2000 --connections 4 -t 120
+    """)
+
+
+def main():
+    args = get_args()
+
+    opts = {"count": 100, "prefix": "/esp32ll/dev_", "host": "127.0.0.1", "port": 1883,
+            "interval": 10.0, "skew": 0.0, "drift": 0.0, "connections": 1, "time": 0.0,
+            "time-topic": None, "config": None}
+    aliases = {"-c": "config", "-n": "count", "-i": "interval", "-s": "skew", "-t": "time"}
+    for opt in args:
+        if opt in ("-h", "--help"):
+            manual()
+            return
+        if not isinstance(opt, str):
+            continue
+        key = aliases.get(opt, opt.lstrip("-"))
+        if key not in opts:
+            print("error: unknown option \"{}\"".format(opt))
+            return
+        value = args[opt]
+        if isinstance(opts[key], int):
+            value = int(value)
+        elif isinstance(opts[key], float):
+            value = float(value)
+        opts.update({key: value})
+
+    user = None
+    password = None
+    topics = ["{}{}".format(opts["prefix"], i) for i in range(opts["count"])]
+    if opts["config"] is not None:
+        conf = Config(opts["config"])
+        topics = [ele.root_topic for ele in conf]
+        opts.update({"host": conf.mqtt_host, "port": conf.mqtt_port})
+        user, password = conf.mqtt_user, conf.mqtt_password
+        if opts["time-topic"] is None and conf.mqtt_time_topic:
+            opts.update({"time-topic": conf.mqtt_time_topic})
+        conf.close()
+
+    fleet = VirtualFleet(opts["host"], opts["port"], user, password, opts["connections"],
+                         time_topic=opts["time-topic"])
+    for topic in topics:
+        fleet.addLock(topic, opts["interval"],
+                      skew=random.uniform(-opts["skew"], opts["skew"]),
+                      drift=random.uniform(-opts["drift"], opts["drift"]))
+
+    print("starting {} virtual lock(s) against {}:{}".format(len(fleet), opts["host"], opts["port"]))
+    fleet.start()
+    t0 = time.time()
+    try:
+        while not opts["time"] or time.time() - t0 < opts["time"]:
+            time.sleep(min(5.0, opts["time"] or 5.0))
+            print("[{:.0f}s] {}".format(time.time() - t0, fleet.stats()))
+    except KeyboardInterrupt:
+        pass
+    fleet.stop()
+    print("stopped, {}".format(fleet.stats()))
+
+
+if __name__ == '__main__':
+    main()
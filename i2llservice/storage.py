@@ -0,0 +1,458 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: storage
+# Created on: 2026/10/18
+
+import abc
+import copy
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+DEVICE_FIELDS = ("mqtt_topic_root", "dynkey16_psk", "storage", "state")
+
+
+class _WriteBackStore(abc.ABC):
+
+    def __init__(self, flush_delay=1.0):
+        """
+        base of config stores, collects changes and writes them back in one
+        batch after a delay
+        :param flush_delay: float, default seconds to collect changes before
+                            writing, 0 to write immediately
+        """
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self.__flush_lock = threading.Lock()
+        self.__dirty = False
+        self.__timer = None
+        self.__deadline = 0
+        self.__deferred = {}
+
+    @abc.abstractmethod
+    def _write(self):
+        """
+        write pending changes, called with flush lock held
+        :return: None
+        """
+        pass
+
+    @abc.abstractmethod
+    def _updateFields(self, device_index, fields):
+        """
+        apply some fields to a device record without scheduling a write back
+        :param device_index: str
+        :param fields: dict
+        :return: bool, False if device does not exist
+        """
+        pass
+
+    def updateDevice(self, device_index, fields, delay=None):
+        """
+        update some fields of a device record, changes of the same device
+        within delay are written together
+        :param device_index: str
+        :param fields: dict, e.g. {"storage": {...}, "state": {...}}
+        :param delay: float (or None), seconds before writing, flush_delay by default
+        :return: bool, False if device does not exist
+        """
+        with self._lock:
+            ret = self._updateFields(device_index, fields)
+        if ret:
+            self.markDirty(delay)
+
+        return ret
+
+    def deferUpdate(self, device_index, getter, delay=None):
+        """
+        schedule an update of a device record whose fields are only read from
+        getter right before writing back, so frequent changes in between cost
+        nothing but a flag
+        :param device_index: str
+        :param getter: callable, returns fields dict of device
+        :param delay: float (or None), seconds before writing, flush_delay by default
+        :return: None
+        """
+        with self._lock:
+            self.__deferred.update({device_index: getter})
+        self.markDirty(delay)
+
+    def markDirty(self, delay=None):
+        """
+        schedule a write back of pending changes
+        :param delay: float (or None), seconds before writing, flush_delay by default,
+                      an earlier deadline replaces a later one
+        :return: None
+        """
+        if delay is None:
+            delay = self.flush_delay
+
+        with self._lock:
+            self.__dirty = True
+            if delay > 0:
+                deadline = time.time() + delay
+                if self.__timer is None or deadline < self.__deadline:
+                    if self.__timer is not None:
+                        self.__timer.cancel()
+                    self.__deadline = deadline
+                    self.__timer = threading.Timer(delay, self.flush)
+                    self.__timer.start()
+
+        if delay <= 0:
+            self.flush()
+
+    def flush(self):
+        """
+        write pending changes now
+        :return: None
+        """
+        with self.__flush_lock:
+            with self._lock:
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    self.__timer = None
+                deferred = self.__deferred
+                self.__deferred = {}
+                for index, getter in deferred.items():
+                    self._updateFields(index, getter())
+                if not self.__dirty:
+                    return
+                self.__dirty = False
+
+            try:
+                self._write()
+            except Exception:
+                with self._lock:
+                    self.__dirty = True
+                raise
+
+    def close(self):
+        self.flush()
+
+
+class JsonStore(_WriteBackStore):
+
+    def __init__(self, filename, flush_delay=1.0):
+        """
+        JSON config file store, the file is read once into memory and every
+        change is written back later in one batch (temp file + rename)
+        :param filename: str (or os.PathLike), JSON config file
+        :param flush_delay: float, seconds to collect changes before writing,
+                            0 to write immediately
+        """
+        super(JsonStore, self).__init__(flush_delay)
+        self.filename = os.fspath(filename)
+        self.__data = {"devices": {}}
+
+        if os.path.isfile(self.filename) and os.path.getsize(self.filename):
+            with open(self.filename, "r") as f:
+                self.__data = json.load(f)
+            if "devices" not in self.__data:
+                self.__data.update({"devices": {}})
+
+    def __str__(self):
+        return self.filename
+
+    def getGlobals(self):
+        """
+        get global settings
+        :return: dict
+        """
+        with self._lock:
+            return {k: v for k, v in self.__data.items() if k != "devices"}
+
+    def setGlobals(self, settings):
+        """
+        update global settings
+        :param settings: dict
+        :return: None
+        """
+        with self._lock:
+            self.__data.update(copy.deepcopy(settings))
+        self.markDirty()
+
+    def getDevices(self):
+        """
+        get all device records
+        :return: dict, {device index: device record dict}
+        """
+        with self._lock:
+            return copy.deepcopy(self.__data["devices"])
+
+    def setDevice(self, device_index, record):
+        """
+        add or replace a device record
+        :param device_index: str
+        :param record: dict
+        :return: None
+        """
+        with self._lock:
+            self.__data["devices"].update({device_index: copy.deepcopy(record)})
+        self.markDirty()
+
+    def setDevices(self, records):
+        """
+        add or replace device records in one batch
+        :param records: dict, {device index: device record dict}
+        :return: None
+        """
+        with self._lock:
+            self.__data["devices"].update(copy.deepcopy(records))
+        self.markDirty()
+
+    def _updateFields(self, device_index, fields):
+        with self._lock:
+            record = self.__data["devices"].get(device_index)
+            if record is None:
+                return False
+            record.update(copy.deepcopy(fields))
+
+        return True
+
+    def removeDevice(self, device_index):
+        """
+        remove a device record
+        :param device_index: str
+        :return: bool, succeed
+        """
+        with self._lock:
+            if device_index not in self.__data["devices"]:
+                return False
+            self.__data["devices"].pop(device_index)
+        self.markDirty()
+
+        return True
+
+    def clearDevices(self):
+        with self._lock:
+            self.__data["devices"].clear()
+        self.markDirty()
+
+    def _write(self):
+        with self._lock:
+            payload = json.dumps(self.__data, indent=2)
+
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        fd, temp_name = tempfile.mkstemp(prefix=".config.", suffix=".tmp", dir=dirname)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.filename):
+                shutil.copymode(self.filename, temp_name)
+            os.replace(temp_name, self.filename)
+        except Exception:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+
+class SQLiteStore(_WriteBackStore):
+
+    def __init__(self, filename, flush_delay=1.0):
+        """
+        SQLite config store, every device record is one row indexed by device
+        index and root topic. Whole records are committed immediately (WAL
+        journal), partial updates from updateDevice are collected and written
+        in one transaction
+        :param filename: str (or os.PathLike), SQLite database file
+        :param flush_delay: float, seconds to collect partial updates before writing
+        """
+        super(SQLiteStore, self).__init__(flush_delay)
+        self.filename = os.fspath(filename)
+        self.__pending = {}
+        self.__con = sqlite3.connect(self.filename, check_same_thread=False)
+        self.__con.execute("PRAGMA journal_mode=WAL")
+        self.__con.execute("PRAGMA synchronous=NORMAL")
+        with self.__con:
+            self.__con.execute("CREATE TABLE IF NOT EXISTS globals ("
+                               "key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.__con.execute("CREATE TABLE IF NOT EXISTS devices ("
+                               "device_index TEXT PRIMARY KEY, "
+                               "mqtt_topic_root TEXT NOT NULL, "
+                               "dynkey16_psk TEXT NOT NULL, "
+                               "storage TEXT NOT NULL, "
+                               "state TEXT NOT NULL DEFAULT '{}')")
+            columns = [ele[1] for ele in self.__con.execute("PRAGMA table_info(devices)")]
+            if "state" not in columns:
+                self.__con.execute("ALTER TABLE devices ADD COLUMN state TEXT NOT NULL DEFAULT '{}'")
+            self.__con.execute("CREATE INDEX IF NOT EXISTS devices_topic "
+                               "ON devices (mqtt_topic_root)")
+
+    def __str__(self):
+        return self.filename
+
+    @staticmethod
+    def __toRow(device_index, record):
+        return (device_index, record["mqtt_topic_root"], record["dynkey16_psk"],
+                json.dumps(record["storage"]), json.dumps(record.get("state", {})))
+
+    @staticmethod
+    def __fromRow(row):
+        return {"mqtt_topic_root": row[1],
+                "dynkey16_psk": row[2],
+                "storage": json.loads(row[3]),
+                "state": json.loads(row[4])}
+
+    def getGlobals(self):
+        """
+        get global settings
+        :return: dict
+        """
+        with self._lock:
+            rows = self.__con.execute("SELECT key, value FROM globals").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def setGlobals(self, settings):
+        """
+        update global settings
+        :param settings: dict
+        :return: None
+        """
+        with self._lock, self.__con:
+            self.__con.executemany("INSERT OR REPLACE INTO globals (key, value) VALUES (?, ?)",
+                                   [(k, json.dumps(v)) for k, v in settings.items()])
+
+    def getDevices(self):
+        """
+        get all device records
+        :return: dict, {device index: device record dict}
+        """
+        self.flush()
+        with self._lock:
+            rows = self.__con.execute("SELECT device_index, mqtt_topic_root, dynkey16_psk, storage, state "
+                                      "FROM devices").fetchall()
+        return {row[0]: self.__fromRow(row) for row in rows}
+
+    def getDeviceByTopic(self, root_topic):
+        """
+        get device record by root topic
+        :param root_topic: str
+        :return: tuple (device index, device record dict), or None
+        """
+        self.flush()
+        with self._lock:
+            row = self.__con.execute("SELECT device_index, mqtt_topic_root, dynkey16_psk, storage, state "
+                                     "FROM devices WHERE mqtt_topic_root = ?", (root_topic,)).fetchone()
+        if row is None:
+            return None
+        return row[0], self.__fromRow(row)
+
+    def setDevice(self, device_index, record):
+        """
+        add or replace a device record
+        :param device_index: str
+        :param record: dict
+        :return: None
+        """
+        with self._lock, self.__con:
+            self.__pending.pop(device_index, None)
+            self.__con.execute("INSERT OR REPLACE INTO devices "
+                               "(device_index, mqtt_topic_root, dynkey16_psk, storage, state) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               self.__toRow(device_index, record))
+
+    def setDevices(self, records):
+        """
+        add or replace device records in one transaction
+        :param records: dict, {device index: device record dict}
+        :return: None
+        """
+        with self._lock, self.__con:
+            for index in records:
+                self.__pending.pop(index, None)
+            self.__con.executemany("INSERT OR REPLACE INTO devices "
+                                   "(device_index, mqtt_topic_root, dynkey16_psk, storage, state) "
+                                   "VALUES (?, ?, ?, ?, ?)",
+                                   [self.__toRow(index, record) for index, record in records.items()])
+
+    def _updateFields(self, device_index, fields):
+        # always True, missing devices are ignored on writing
+        for k in fields:
+            # field names are put into SQL text, never rely on assert for this
+            if k not in DEVICE_FIELDS:
+                raise ValueError("unknown device field \"{}\"".format(k))
+        with self._lock:
+            pending = self.__pending.get(device_index)
+            if pending is None:
+                pending = {}
+                self.__pending.update({device_index: pending})
+            for k, v in fields.items():
+                pending.update({k: json.dumps(v) if k in ("storage", "state") else v})
+
+        return True
+
+    def removeDevice(self, device_index):
+        """
+        remove a device record
+        :param device_index: str
+        :return: bool, succeed
+        """
+        with self._lock, self.__con:
+            self.__pending.pop(device_index, None)
+            cur = self.__con.execute("DELETE FROM devices WHERE device_index = ?", (device_index,))
+        return cur.rowcount > 0
+
+    def clearDevices(self):
+        with self._lock, self.__con:
+            self.__pending.clear()
+            self.__con.execute("DELETE FROM devices")
+
+    def _write(self):
+        with self._lock:
+            pending = self.__pending
+            self.__pending = {}
+            with self.__con:
+                for index, fields in pending.items():
+                    keys = list(fields.keys())
+                    self.__con.execute("UPDATE devices SET {} WHERE device_index = ?".format(
+                        ", ".join("{} = ?".format(k) for k in keys)),
+                        [fields[k] for k in keys] + [index])
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.__con.close()
+
+
+def openStore(filename, flush_delay=1.0):
+    """
+    open config store, backend is chosen by file suffix (.db, .sqlite and
+    .sqlite3 for SQLite, JSON for others)
+    :param filename: str (or os.PathLike)
+    :param flush_delay: float, write back delay of store
+    :return: JsonStore or SQLiteStore
+    """
+    if os.path.splitext(os.fspath(filename))[1].lower() in SQLITE_SUFFIXES:
+        return SQLiteStore(filename, flush_delay)
+    return JsonStore(filename, flush_delay)
+
+
+def convertStore(src, dst):
+    """
+    copy global settings and every device record from one store into another
+    (e.g. import a config.json into a SQLite database or export it back)
+    :param src: str (or os.PathLike), source config file
+    :param dst: str (or os.PathLike), target config file, replaced devices
+    :return: int, count of devices copied
+    """
+    src_store = openStore(src)
+    dst_store = openStore(dst)
+
+    dst_store.setGlobals(src_store.getGlobals())
+    dst_store.clearDevices()
+    devices = src_store.getDevices()
+    dst_store.setDevices(devices)
+
+    src_store.close()
+    dst_store.close()
+
+    return len(devices)
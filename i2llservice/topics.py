@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: topics
+# Created on: 2026/10/18
+
+import threading
+
+
+def normalizeTopic(topic: str) -> str:
+    """
+    normalize MQTT topic root by stripping trailing slashes
+    :param topic: str, topic root
+    :return: str
+    """
+    while len(topic) > 1 and topic[-1] == "/":
+        topic = topic[:-1]
+
+    return topic
+
+
+def matchFilter(topic_filter: str, topic: str) -> bool:
+    """
+    check if a topic matches an MQTT subscription filter
+    :param topic_filter: str, filter, "+" and "#" wildcards are allowed
+    :param topic: str, topic of message
+    :return: bool
+    """
+    if topic_filter == topic:
+        return True
+
+    levels = topic.split("/")
+    filters = topic_filter.split("/")
+    for i, ele in enumerate(filters):
+        if ele == "#":
+            return True
+        if i >= len(levels):
+            return False
+        if ele != "+" and ele != levels[i]:
+            return False
+
+    return len(filters) == len(levels)
+
+
+class _TrieNode(object):
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
+
+
+class TopicIndex(object):
+
+    def __init__(self, suffix=None):
+        """
+        topic to object index, objects are registered by topic root and matched
+        against every topic under that root (MQTT level based, "+" and "#"
+        wildcards are allowed in roots)
+        :param suffix: str (or None), topic suffix that is matched in O(1),
+                       e.g. "data" for "<root>/data"
+        """
+        self.suffix = suffix
+        self.__root = _TrieNode()
+        self.__count = 0
+        self.__lock = threading.Lock()
+        self.__exact = {}
+        self.__exact_dirty = False
+
+    def __len__(self):
+        return self.__count
+
+    def __walk(self, levels):
+        ret = []
+        nodes = [self.__root]
+        for level in levels:
+            if not nodes:
+                break
+            next_nodes = []
+            for node in nodes:
+                ret.extend(node.values)
+                children = node.children
+                if "#" in children:
+                    ret.extend(children["#"].values)
+                if level in children:
+                    next_nodes.append(children[level])
+                if "+" in children:
+                    next_nodes.append(children["+"])
+            nodes = next_nodes
+
+        for node in nodes:
+            ret.extend(node.values)
+            if "#" in node.children:
+                ret.extend(node.children["#"].values)
+
+        return ret
+
+    def __rebuildExact(self):
+        exact = {}
+        if self.suffix is not None:
+            stack = [(self.__root, [])]
+            while stack:
+                node, levels = stack.pop()
+                if node.values and "+" not in levels and "#" not in levels:
+                    levels = levels + [self.suffix]
+                    exact.update({"/".join(levels): tuple(self.__walk(levels))})
+                for level, child in node.children.items():
+                    stack.append((child, levels + [level]))
+
+        self.__exact = exact
+        self.__exact_dirty = False
+
+    def add(self, topic_root, value):
+        """
+        register an object with its topic root
+        :param topic_root: str, topic root
+        :param value: object
+        :return: None
+        """
+        with self.__lock:
+            node = self.__root
+            for level in normalizeTopic(topic_root).split("/"):
+                if level not in node.children:
+                    node.children.update({level: _TrieNode()})
+                node = node.children[level]
+            node.values.append(value)
+            self.__count += 1
+            self.__exact_dirty = True
+
+    def remove(self, topic_root, value):
+        """
+        unregister an object
+        :param topic_root: str, topic root that the object was registered with
+        :param value: object
+        :return: bool, succeed
+        """
+        with self.__lock:
+            path = [self.__root]
+            levels = normalizeTopic(topic_root).split("/")
+            for level in levels:
+                node = path[-1].children.get(level)
+                if node is None:
+                    return False
+                path.append(node)
+
+            if value not in path[-1].values:
+                return False
+            path[-1].values.remove(value)
+            self.__count -= 1
+
+            # prune empty branches
+            for i in range(len(levels), 0, -1):
+                node = path[i]
+                if node.values or node.children:
+                    break
+                path[i - 1].children.pop(levels[i - 1])
+
+            self.__exact_dirty = True
+
+        return True
+
+    def clear(self):
+        with self.__lock:
+            self.__root = _TrieNode()
+            self.__count = 0
+            self.__exact = {}
+            self.__exact_dirty = False
+
+    def match(self, topic):
+        """
+        get all objects whose topic root covers given topic
+        :param topic: str, full topic of incoming message
+        :return: tuple of objects
+        """
+        if self.__exact_dirty:
+            with self.__lock:
+                if self.__exact_dirty:
+                    self.__rebuildExact()
+
+        ret = self.__exact.get(topic)
+        if ret is None:
+            with self.__lock:
+                ret = tuple(self.__walk(topic.split("/")))
+
+        return ret
+
+
+if __name__ == '__main__':
+    index = TopicIndex("data")
+    index.add("/esp32ll/dev_1", "dev_1")
+    index.add("/esp32ll/dev_12/", "dev_12")
+    index.add("/esp32ll", "all")
+    index.add("/esp32ll/+", "wildcard")
+    print("matched: {}".format(index.match("/esp32ll/dev_1/data")))
+    print("matched: {}".format(index.match("/esp32ll/dev_12/data")))
+    print("matched: {}".format(index.match("/esp32ll/dev_3/data")))
+    index.remove("/esp32ll", "all")
+    print("matched: {}".format(index.match("/esp32ll/dev_1/data")))
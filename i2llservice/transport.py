@@ -0,0 +1,298 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: transport
+# Created on: 2026/10/18
+
+from paho.mqtt import client
+import abc
+import collections
+import itertools
+import threading
+
+if not __package__:
+    from topics import matchFilter
+else:
+    from .topics import matchFilter
+
+
+class MqttTransport(abc.ABC):
+    """
+    MQTT client interface used by LLServer and LLMqttClient, it is the subset of
+    paho.mqtt.client.Client that they call, paho clients are registered as
+    virtual subclasses so they can be used directly
+
+    callbacks have the same signatures as paho (1.x):
+        on_connect(transport, userdata, flags, rc)
+        on_disconnect(transport, userdata, rc)
+        on_message(transport, userdata, message)
+        on_subscribe(transport, userdata, mid, granted_qos)
+    """
+
+    @abc.abstractmethod
+    def username_pw_set(self, username, password=None):
+        pass
+
+    @abc.abstractmethod
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass
+
+    @abc.abstractmethod
+    def connect(self, host, port=1883, keepalive=60):
+        pass
+
+    @abc.abstractmethod
+    def disconnect(self):
+        pass
+
+    @abc.abstractmethod
+    def is_connected(self):
+        pass
+
+    @abc.abstractmethod
+    def loop(self, timeout=1.0):
+        pass
+
+    @abc.abstractmethod
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        pass
+
+    @abc.abstractmethod
+    def subscribe(self, topic, qos=0):
+        pass
+
+    @abc.abstractmethod
+    def unsubscribe(self, topic):
+        pass
+
+
+MqttTransport.register(client.Client)
+
+
+class LoopbackMessage(object):
+    __slots__ = ("topic", "payload", "qos", "retain", "mid")
+
+    def __init__(self, topic, payload, qos=0, retain=False, mid=0):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.mid = mid
+
+
+class LoopbackPublishInfo(object):
+    __slots__ = ("rc", "mid")
+
+    def __init__(self, rc, mid):
+        self.rc = rc
+        self.mid = mid
+
+    def is_published(self):
+        return self.rc == client.MQTT_ERR_SUCCESS
+
+    def wait_for_publish(self, timeout=None):
+        return None
+
+
+class LoopbackBroker(object):
+
+    def __init__(self, synchronous=True):
+        """
+        in-memory MQTT broker for LoopbackTransport, QoS and retained messages
+        are ignored
+        :param synchronous: bool, deliver messages from the thread that publishes
+                            them, otherwise queue them until loop() of receiving
+                            transport is called
+        """
+        self.synchronous = synchronous
+        self.published = 0
+        self.delivered = 0
+        self.__exact = {}
+        self.__wildcards = []
+        self.__lock = threading.Lock()
+
+    def subscribe(self, transport, topic_filter):
+        with self.__lock:
+            if "+" in topic_filter or "#" in topic_filter:
+                if (topic_filter, transport) not in self.__wildcards:
+                    self.__wildcards.append((topic_filter, transport))
+            else:
+                subscribers = self.__exact.get(topic_filter)
+                if subscribers is None:
+                    self.__exact.update({topic_filter: (transport,)})
+                elif transport not in subscribers:
+                    self.__exact.update({topic_filter: subscribers + (transport,)})
+
+    def unsubscribe(self, transport, topic_filter):
+        with self.__lock:
+            subscribers = self.__exact.get(topic_filter)
+            if subscribers is not None:
+                subscribers = tuple(ele for ele in subscribers if ele is not transport)
+                if subscribers:
+                    self.__exact.update({topic_filter: subscribers})
+                else:
+                    self.__exact.pop(topic_filter)
+            if (topic_filter, transport) in self.__wildcards:
+                self.__wildcards.remove((topic_filter, transport))
+
+    def detach(self, transport):
+        """
+        remove all subscriptions of a transport
+        :param transport: LoopbackTransport
+        :return: None
+        """
+        with self.__lock:
+            for topic_filter, subscribers in list(self.__exact.items()):
+                if transport in subscribers:
+                    subscribers = tuple(ele for ele in subscribers if ele is not transport)
+                    if subscribers:
+                        self.__exact.update({topic_filter: subscribers})
+                    else:
+                        self.__exact.pop(topic_filter)
+            self.__wildcards = [ele for ele in self.__wildcards if ele[1] is not transport]
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """
+        route a message to subscribers
+        :param topic: str
+        :param payload: bytes
+        :param qos: int
+        :param retain: bool
+        :return: int, count of subscribers that received message
+        """
+        self.published += 1
+        targets = self.__exact.get(topic, ())
+        if self.__wildcards:
+            targets = targets + tuple(transport for topic_filter, transport in self.__wildcards
+                                      if matchFilter(topic_filter, topic))
+        for transport in targets:
+            transport.deliver(LoopbackMessage(topic, payload, qos, retain))
+        self.delivered += len(targets)
+
+        return len(targets)
+
+
+class LoopbackTransport(MqttTransport):
+
+    def __init__(self, broker, client_id="", userdata=None):
+        """
+        in-memory MQTT client connected to a LoopbackBroker, CONNACK and SUBACK
+        are delivered from loop() like a network client would do
+        :param broker: LoopbackBroker
+        :param client_id: str
+        :param userdata: object, passed to callbacks
+        """
+        self.broker = broker
+        self.client_id = client_id
+        self.userdata = userdata
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.on_subscribe = None
+
+        self.__connected = False
+        self.__mid = itertools.count(1)
+        self.__events = collections.deque()
+        self.__cond = threading.Condition()
+
+    def __repr__(self):
+        return "<LoopbackTransport \"{}\">".format(self.client_id)
+
+    def username_pw_set(self, username, password=None):
+        pass
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass
+
+    def user_data_set(self, userdata):
+        self.userdata = userdata
+
+    def __post(self, event):
+        with self.__cond:
+            self.__events.append(event)
+            self.__cond.notify()
+
+    def connect(self, host=None, port=1883, keepalive=60):
+        self.__connected = True
+        self.__post(("connack",))
+        return client.MQTT_ERR_SUCCESS
+
+    def disconnect(self):
+        if not self.__connected:
+            return client.MQTT_ERR_NO_CONN
+        self.__connected = False
+        self.broker.detach(self)
+        self.__post(("disconnect",))
+        return client.MQTT_ERR_SUCCESS
+
+    def is_connected(self):
+        return self.__connected
+
+    def deliver(self, message):
+        """
+        called by broker for every message that matches a subscription
+        :param message: LoopbackMessage
+        :return: None
+        """
+        if self.broker.synchronous:
+            if self.on_message is not None:
+                self.on_message(self, self.userdata, message)
+        else:
+            self.__post(("message", message))
+
+    def loop(self, timeout=1.0):
+        """
+        process queued events, waits up to timeout if there is none
+        :param timeout: float, seconds
+        :return: int, MQTT_ERR_SUCCESS
+        """
+        with self.__cond:
+            if not self.__events:
+                self.__cond.wait(timeout)
+            events = list(self.__events)
+            self.__events.clear()
+
+        for event in events:
+            if event[0] == "message":
+                if self.on_message is not None:
+                    self.on_message(self, self.userdata, event[1])
+            elif event[0] == "connack":
+                if self.on_connect is not None:
+                    self.on_connect(self, self.userdata, {"session present": 0}, 0)
+            elif event[0] == "suback":
+                if self.on_subscribe is not None:
+                    self.on_subscribe(self, self.userdata, event[1], event[2])
+            elif event[0] == "disconnect":
+                if self.on_disconnect is not None:
+                    self.on_disconnect(self, self.userdata, 0)
+
+        return client.MQTT_ERR_SUCCESS
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        if not self.__connected:
+            return LoopbackPublishInfo(client.MQTT_ERR_NO_CONN, 0)
+        if isinstance(payload, (bytearray, memoryview)):
+            payload = bytes(payload)
+        self.broker.publish(topic, payload, qos, retain)
+        return LoopbackPublishInfo(client.MQTT_ERR_SUCCESS, next(self.__mid))
+
+    def subscribe(self, topic, qos=0):
+        if not self.__connected:
+            return client.MQTT_ERR_NO_CONN, None
+        if isinstance(topic, str):
+            topic = [(topic, qos)]
+        for topic_filter, ele in topic:
+            self.broker.subscribe(self, topic_filter)
+        mid = next(self.__mid)
+        self.__post(("suback", mid, tuple(ele for topic_filter, ele in topic)))
+        return client.MQTT_ERR_SUCCESS, mid
+
+    def unsubscribe(self, topic):
+        if not self.__connected:
+            return client.MQTT_ERR_NO_CONN, None
+        if isinstance(topic, str):
+            topic = [topic]
+        for topic_filter in topic:
+            self.broker.unsubscribe(self, topic_filter)
+        return client.MQTT_ERR_SUCCESS, next(self.__mid)
@@ -5,6 +5,9 @@
 # Filename: utils
 # Created on: 2022/10/10
 
+# keypad digit of every byte value, for bytes.translate()
+DEC_TABLE = bytes(int(ele / 25.6) + 1 for ele in range(256))
+
 
 def dyn16ToDec(data: bytes, length: int = 4) -> list:
     """
@@ -13,7 +16,7 @@ def dyn16ToDec(data: bytes, length: int = 4) -> list:
     :param length: int
     :return: list of decimal digit
     """
-    ret = [int(ele / 25.6) + 1 for ele in data[:length]]
+    ret = list(bytes(data[:length]).translate(DEC_TABLE))
 
     return ret
 
@@ -35,10 +35,11 @@ setuptools.setup(
         'paho-mqtt'
     ],
     packages=setuptools.find_packages(),
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     entry_points={'console_scripts':
         [
-            "i2llsrv = i2llservice.server:main"
+            "i2llsrv = i2llservice.server:main",
+            "i2llsim = i2llservice.simulator:main"
         ]
     }
 )
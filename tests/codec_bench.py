@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: codec_bench
+# Created on: 2026/10/18
+
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice import codec
+
+
+ROUNDS = 200000
+PAYLOAD = int(time.time()).to_bytes(4, "little", signed=True)
+
+
+def legacyEncode(flow_cnt, cmd_id, payload):
+    data = b""
+    data += bytes((flow_cnt,))
+    data += bytes((cmd_id,))
+    data += int(len(payload)).to_bytes(2, "big", signed=False)
+    data += payload
+    data += bytes((sum(data) % 256,))
+    return data
+
+
+def legacyDecode(data):
+    flow_cnt = data[0]
+    cmd_id = data[1]
+    length = int().from_bytes(data[2:4], "big", signed=False)
+    payload = data[4:4 + length]
+    status = sum(data[0:-1]) % 256 == data[-1]
+    return status, flow_cnt, cmd_id, payload
+
+
+def bench(name, func, *args):
+    t0 = time.perf_counter()
+    for i in range(ROUNDS):
+        func(*args)
+    dt = time.perf_counter() - t0
+    print("{:<24} {:>8.3f} us/op  {:>10.0f} op/s".format(name, dt / ROUNDS * 1e6, ROUNDS / dt))
+
+
+def main():
+    frame = bytes(codec.encode(1, codec.CMD_TIME_CALIBRATION, PAYLOAD))
+    assert frame == legacyEncode(1, codec.CMD_TIME_CALIBRATION, PAYLOAD)
+
+    buf = bytearray(codec.frameSize(len(PAYLOAD)))
+    print("{} rounds, {} byte payload".format(ROUNDS, len(PAYLOAD)))
+    bench("legacy encode", legacyEncode, 1, codec.CMD_TIME_CALIBRATION, PAYLOAD)
+    bench("codec encode", codec.encode, 1, codec.CMD_TIME_CALIBRATION, PAYLOAD)
+    bench("codec encodeInto", codec.encodeInto, buf, 0, 1, codec.CMD_TIME_CALIBRATION, PAYLOAD)
+    bench("codec patchFlowCounter", codec.patchFlowCounter, buf, 2)
+    bench("legacy decode", legacyDecode, frame)
+    bench("codec decode", codec.decode, frame)
+
+
+if __name__ == '__main__':
+    main()
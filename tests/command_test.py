@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: command_test
+# Created on: 2026/10/18
+
+
+from i2cylib.utils import Logger
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice.client import I2LLClient
+from i2llservice.config import Config
+from i2llservice.server import LLServer
+from i2llservice.transport import LoopbackBroker, LoopbackTransport
+
+
+def test_configurate_multi_digit_storage():
+    with tempfile.TemporaryDirectory() as workdir:
+        conf = Config(os.path.join(workdir, "config.json"))
+        conf.log_file = os.path.join(workdir, "i2ll.log")
+        conf.log_level = "WARNING"
+        conf.i2tcp_port = random.randint(20000, 40000)
+        conf.saveConfig()
+        conf.addDevice(1)
+        conf.addDevice(12)
+
+        srv = LLServer(conf, secured_connection=False, verbose=False,
+                       transport=LoopbackTransport(LoopbackBroker(), "test"))
+        srv.start()
+        clt = I2LLClient("127.0.0.1", conf.i2tcp_port, conf.i2tcp_psk,
+                         logger=Logger(level="ERROR", echo=False))
+        try:
+            assert clt.connect(auto_reconnect=False)
+            storage = {"motor_offset": 1234, "note": "a,b"}
+            # 0x20 payload is "<root topic>,<json storage>", json begins right after the first comma
+            assert clt.getDeviceClient("/esp32ll/dev_12").configurateDevice(storage)
+
+            assert srv.getDeviceClient("/esp32ll/dev_12").device_config.storage == storage
+            assert srv.getDeviceClient("/esp32ll/dev_1").device_config.storage == {"motor_offset": 0}
+            assert clt.getDeviceClient("/esp32ll/dev_12").getStorage() == storage
+        finally:
+            clt.reset()
+            srv.kill()
+            conf.close()
+
+        conf = Config(os.path.join(workdir, "config.json"))
+        assert conf.getDevice(-1).storage == storage
+        conf.close()
+
+
+def main():
+    test_configurate_multi_digit_storage()
+    print("all passed")
+
+
+if __name__ == '__main__':
+    main()
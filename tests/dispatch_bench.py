@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: dispatch_bench
+# Created on: 2026/10/18
+
+
+from i2cylib.utils import get_args
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice import codec
+from i2llservice.config import Config
+from i2llservice.server import LLServer
+from i2llservice.transport import LoopbackBroker, LoopbackTransport
+
+
+DEVICES = 1000
+MESSAGES = 200000
+TOLERANCE = 0.2
+
+
+def manual():
+    print("""MQTT dispatch benchmark over in-memory loopback transport
+
+    dispatch_bench.py [-n MESSAGES] [--save FILE] [--compare FILE] [--tolerance RATIO]
+
+    Options:
+     -n             - messages per case (default {})
+     --save         - save results to a JSON file as baseline
+     --compare      - compare results with a saved baseline, exits with 1 if any
+                      case is slower than baseline by more than tolerance
+     --tolerance    - allowed slowdown ratio (default {})
+    """.format(MESSAGES, TOLERANCE))
+
+
+def run(name, device, frames, topics, count):
+    t0 = time.perf_counter()
+    n_frames = len(frames)
+    n_topics = len(topics)
+    for i in range(count):
+        device.publish(topics[i % n_topics], frames[i % n_frames])
+    dt = time.perf_counter() - t0
+    rate = count / dt
+    print("{:<20} {:>10} msg(s) {:>8.3f}s {:>12.0f} msg/s".format(name, count, dt, rate))
+    return rate
+
+
+def main():
+    args = get_args()
+    if "-h" in args or "--help" in args:
+        manual()
+        return
+    count = int(args.get("-n", MESSAGES))
+    tolerance = float(args.get("--tolerance", TOLERANCE))
+
+    workdir = tempfile.mkdtemp()
+    conf = Config(os.path.join(workdir, "config.json"))
+    conf.i2tcp_port = random.randint(20000, 40000)
+    conf.log_file = os.path.join(workdir, "i2ll.log")
+    conf.log_level = "INFO"
+    conf.saveConfig()
+    for i in range(DEVICES):
+        conf.addDevice()
+
+    broker = LoopbackBroker()
+    srv = LLServer(conf, verbose=False, secured_connection=False,
+                   transport=LoopbackTransport(broker, "server"))
+    srv.start()
+    while srv.subscription_duration is None:
+        time.sleep(0.01)
+
+    device = LoopbackTransport(broker, "devices")
+    device.connect()
+    topics = [srv[i].feedback_topic for i in range(len(srv))]
+
+    now = int(time.time())
+    results = {}
+    frames = [bytes(codec.encode(i, codec.CMD_DEVICE_OK, b"")) for i in range(256)]
+    t0 = time.perf_counter()
+    for i in range(count):
+        codec.decode(frames[i & 0xff])
+    results["codec_decode"] = count / (time.perf_counter() - t0)
+    print("{:<20} {:>10} msg(s) {:>8.3f}s {:>12.0f} msg/s".format(
+        "codec_decode", count, count / results["codec_decode"], results["codec_decode"]))
+
+    results["ok_flag"] = run("ok_flag", device, frames, topics, count)
+    frames = [bytes(codec.encode(i, codec.CMD_HEARTBEAT, codec.UINT32_LE.pack(now))) for i in range(256)]
+    results["heartbeat"] = run("heartbeat", device, frames, topics, count)
+    frames = [frame[:-1] + bytes(((frame[-1] + 1) & 0xff,)) for frame in frames]
+    results["bad_checksum"] = run("bad_checksum", device, frames, topics, count)
+    results["unknown_topic"] = run("unknown_topic", device, frames, ["/esp32ll/unknown/data"], count)
+
+    print("frames received: {}, checksum failures: {}, broker delivered: {}".format(
+        sum(value for label, value in srv.frames_received.samples()),
+        srv.checksum_failures.get(), broker.delivered))
+
+    srv.kill()
+    conf.close()
+
+    if "--save" in args:
+        with open(args["--save"], "w") as f:
+            json.dump(results, f, indent=2)
+        print("baseline saved to \"{}\"".format(args["--save"]))
+
+    if "--compare" in args:
+        with open(args["--compare"], "r") as f:
+            baseline = json.load(f)
+        failed = False
+        for name, rate in results.items():
+            if name not in baseline:
+                continue
+            ratio = rate / baseline[name]
+            regressed = ratio < 1 - tolerance
+            failed = failed or regressed
+            print("{:<20} {:>7.1%} of baseline{}".format(name, ratio, "  REGRESSION" if regressed else ""))
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
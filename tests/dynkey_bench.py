@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: dynkey_bench
+# Created on: 2026/10/18
+
+
+from i2cylib.crypto import DynKey16
+from i2cylib.utils import get_args
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice.keycache import DynKeyCache
+from i2llservice.utils import dyn16ToDec
+
+
+DEVICES = 10000
+LOOKUPS = 200000
+TOLERANCE = 1
+
+
+def manual():
+    print("""DynKey16 code cache benchmark
+
+    dynkey_bench.py [-d DEVICES] [-n LOOKUPS] [-t TOLERANCE]
+
+    Options:
+     -d             - devices in cache (default {})
+     -n             - cached lookups and code verifications (default {})
+     -t             - slots tolerated by code verification (default {})
+    """.format(DEVICES, LOOKUPS, TOLERANCE))
+
+
+def report(name, count, dt):
+    print("{:<28} {:>10} {:>8.3f}s {:>12.0f} /s".format(name, count, dt, count / dt))
+
+
+def main():
+    args = get_args()
+    if "-h" in args or "--help" in args:
+        manual()
+        return
+    devices = int(args.get("-d", DEVICES))
+    lookups = int(args.get("-n", LOOKUPS))
+    tolerance = int(args.get("-t", TOLERANCE))
+
+    keygens = [DynKey16(os.urandom(16).hex().encode()) for i in range(devices)]
+
+    t0 = time.perf_counter()
+    for keygen in keygens:
+        keygen.keygen()
+    report("DynKey16.keygen", devices, time.perf_counter() - t0)
+
+    cache = DynKeyCache()
+    for i, keygen in enumerate(keygens):
+        cache.add(i, keygen)
+
+    now = time.time()
+    t0 = time.perf_counter()
+    cnt = cache.refresh(now)
+    report("window fill (x{})".format(len(cache.window)), cnt, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    cnt = cache.refresh(now + cache.divide)
+    report("next slot precompute", cnt, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for i in range(lookups):
+        cache.get(i % devices, timestamp=now)
+    report("cached lookup", lookups, time.perf_counter() - t0)
+
+    codes = [dyn16ToDec(cache.get(i, (i % 3) - 1, now)) for i in range(devices)]
+    t0 = time.perf_counter()
+    for i in range(lookups):
+        cache.matchDigits(i % devices, codes[i % devices], tolerance, now)
+    report("verify, tolerance {}".format(tolerance), lookups, time.perf_counter() - t0)
+
+    wrong = [[(ele % 10) + 1 for ele in code] for code in codes]
+    t0 = time.perf_counter()
+    for i in range(lookups):
+        cache.matchDigits(i % devices, wrong[i % devices], tolerance, now)
+    report("reject, tolerance {}".format(tolerance), lookups, time.perf_counter() - t0)
+
+    mismatch = sum(1 for i, keygen in enumerate(keygens) if cache.get(i) != keygen.keygen())
+    print("")
+    print("devices: {}, hits: {}, misses: {}, mismatches: {}".format(
+        devices, cache.hits, cache.misses, mismatch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: fleet_bench
+# Created on: 2026/10/18
+
+
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice.config import Config
+from i2llservice.server import LLServer
+from i2llservice.simulator import VirtualFleet
+
+
+MQTT_HOST = "127.0.0.1"
+MQTT_PORT = 1883
+DEVICES = 500
+HEARTBEAT_INTERVAL = 2.0
+MAX_SKEW = 60
+DURATION = 20
+CONNECTIONS = 4
+
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def fleetProcess(topics, ready, result):
+    # run virtual locks in their own process so that CPU usage of server is measured alone
+    fleet = VirtualFleet(MQTT_HOST, MQTT_PORT, connections=CONNECTIONS)
+    for topic in topics:
+        fleet.addLock(topic, HEARTBEAT_INTERVAL, skew=random.uniform(-MAX_SKEW, MAX_SKEW))
+    ready.wait()
+    fleet.start()
+    while ready.is_set():
+        time.sleep(0.1)
+    fleet.stop()
+    result.put((fleet.stats(), {lock.root_topic: lock.first_heartbeat for lock in fleet}))
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    conf = Config(os.path.join(workdir, "config.json"))
+    conf.mqtt_host = MQTT_HOST
+    conf.mqtt_port = MQTT_PORT
+    conf.mqtt_user = None
+    conf.mqtt_password = None
+    conf.mqtt_client_id = "I2LL-Bench-{}".format(random.randint(0, 0xffffff))
+    conf.i2tcp_port = random.randint(20000, 40000)
+    conf.log_file = os.path.join(workdir, "i2ll.log")
+    conf.log_level = "INFO"
+    conf.saveConfig()
+    for i in range(DEVICES):
+        conf.addDevice()
+
+    mem0 = rss()
+    srv = LLServer(conf, verbose=False, secured_connection=False)
+    srv.start()
+    t0 = time.time()
+    while srv.subscription_duration is None:
+        if time.time() - t0 > 30:
+            print("error: server failed to subscribe feedback topics")
+            srv.kill()
+            return
+        time.sleep(0.05)
+    print("{} device(s) subscribed in {:.3f}s".format(DEVICES, srv.subscription_duration))
+
+    ready = multiprocessing.Event()
+    result = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=fleetProcess,
+                                   args=([ele.root_topic for ele in conf], ready, result))
+    proc.start()
+    time.sleep(1)
+
+    clients = list(srv[i] for i in range(len(srv)))
+    online_at = {}
+    ready.set()
+    t0 = time.time()
+    while len(online_at) < len(clients) and time.time() - t0 < HEARTBEAT_INTERVAL * 5:
+        now = time.time()
+        for con in clients:
+            if con.is_online and con.topic_root not in online_at:
+                online_at.update({con.topic_root: now})
+        time.sleep(0.01)
+    print("{}/{} device(s) online after {:.3f}s".format(len(online_at), len(clients), time.time() - t0))
+
+    frames0 = sum(value for label, value in srv.frames_received.samples())
+    dispatched0 = len(srv.dispatch_latency)
+    srv.dispatch_latency.reset()
+    usage0 = resource.getrusage(resource.RUSAGE_SELF)
+    t1 = time.time()
+    time.sleep(DURATION)
+    dt = time.time() - t1
+    usage1 = resource.getrusage(resource.RUSAGE_SELF)
+    frames = sum(value for label, value in srv.frames_received.samples()) - frames0
+    cpu = (usage1.ru_utime - usage0.ru_utime) + (usage1.ru_stime - usage0.ru_stime)
+
+    ready.clear()
+    stats, first_heartbeats = result.get(timeout=30)
+    proc.join()
+
+    latencies = sorted(online_at[topic] - ts for topic, ts in first_heartbeats.items()
+                       if ts is not None and topic in online_at)
+
+    print("")
+    print("devices:                {}".format(DEVICES))
+    print("heartbeat interval:     {}s".format(HEARTBEAT_INTERVAL))
+    print("frames received:        {} in {:.1f}s, {:.0f} frame(s)/s".format(frames, dt, frames / dt))
+    print("dispatch latency:       p50 <= {}s, p99 <= {}s, {} message(s)".format(
+        srv.dispatch_latency.percentile(50), srv.dispatch_latency.percentile(99),
+        len(srv.dispatch_latency) + dispatched0))
+    if latencies:
+        print("online detection:       p50 {:.3f}s, p99 {:.3f}s, max {:.3f}s".format(
+            latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], latencies[-1]))
+    print("server CPU:             {:.1f}%".format(cpu / dt * 100))
+    print("server memory:          {:.1f} MiB RSS, {:.1f} MiB since start".format(
+        rss() / 1048576, (rss() - mem0) / 1048576))
+    print("time syncs:             {} individual, {} broadcast".format(
+        sum(con.time_syncs for con in clients), srv.time_broadcasts))
+    print("fleet:                  {}".format(stats))
+
+    srv.kill()
+    conf.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: i2tcp_bench
+# Created on: 2026/10/18
+
+
+from i2cylib.utils import get_args, Logger
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice import codec
+from i2llservice.client import I2LLClient
+from i2llservice.config import Config
+from i2llservice.server import LLServer
+from i2llservice.transport import LoopbackBroker, LoopbackTransport
+
+
+DEVICES = 200
+CLIENTS = 16
+COMMANDS = 200
+MAX_CONNECTIONS = 20
+BUFFER_SIZE = 50
+DEPTH = 16
+OPERATIONS = ("isOnline", "getStorage", "unlock", "configurateDevice")
+
+
+def manual():
+    print("""I2TCP client benchmark and load driver
+
+    i2tcp_bench.py [-c CLIENTS] [-n COMMANDS] [-d DEVICES] [--workers N]
+                   [--max-connections N] [--buffer N] [--secured]
+                   [--pipelined] [--depth N]
+
+    Options:
+     -c                 - concurrent I2LLClient connections (default {})
+     -n                 - commands issued by every client (default {})
+     -d                 - devices on server (default {})
+     --workers          - server command worker threads (default from config, 0)
+     --max-connections  - max_connections of LLServer (default {})
+     --buffer           - max_buffer_size of LLServer (default {})
+     --secured          - use secured I2TCP sessions
+     --pipelined        - use tagged requests, keeping up to --depth commands
+                          in flight per connection
+     --depth            - requests in flight per pipelined client (default {})
+    """.format(CLIENTS, COMMANDS, DEVICES, MAX_CONNECTIONS, BUFFER_SIZE, DEPTH))
+
+
+def percentile(samples, p):
+    if not samples:
+        return float("nan")
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def heartbeatThread(device, topics, alive):
+    # keep devices online on server side
+    cnt = 0
+    while alive():
+        payload = codec.UINT32_LE.pack(int(time.time()))
+        for topic in topics:
+            device.publish(topic, codec.encode(cnt, codec.CMD_HEARTBEAT, payload))
+        cnt += 1
+        for i in range(50):
+            if not alive():
+                break
+            time.sleep(0.1)
+
+
+def issue(device, op, wait=True):
+    if op == "configurateDevice":
+        return device.configurateDevice({"motor_offset": random.randint(0, 4095)}, wait=wait)
+    return getattr(device, op)(wait=wait)
+
+
+def clientThread(index, port, psk, secured, commands, depth, barrier, results):
+    logger = Logger(level="ERROR", echo=False)
+    clt = I2LLClient("127.0.0.1", port, psk, logger=logger, pipelined=depth > 0)
+    latencies = {ele: [] for ele in OPERATIONS}
+    failures = 0
+    t_connect = time.perf_counter()
+    if not clt.connect(timeout=30, auto_reconnect=False):
+        barrier.wait()
+        results[index] = {"connected": False}
+        return
+    t_connect = time.perf_counter() - t_connect
+    devices = [clt[i] for i in range(len(clt))]
+    barrier.wait()
+
+    in_flight = []
+    for i in range(commands):
+        op = OPERATIONS[i % len(OPERATIONS)]
+        device = random.choice(devices)
+        t0 = time.perf_counter()
+        if depth:
+            if len(in_flight) >= depth:
+                failures += collect(in_flight.pop(0), latencies)
+            in_flight.append((op, t0, issue(device, op, wait=False)))
+            continue
+        ret = issue(device, op)
+        latencies[op].append(time.perf_counter() - t0)
+        if ret is None or ret is False:
+            failures += 1
+    for ele in in_flight:
+        failures += collect(ele, latencies)
+
+    t_done = time.perf_counter()
+    clt.reset()
+    results[index] = {"connected": True, "connect_time": t_connect, "done": t_done,
+                      "latencies": latencies, "failures": failures}
+
+
+def collect(request, latencies):
+    op, t0, future = request
+    try:
+        ret = future.result(30)
+    except Exception:
+        ret = None
+    latencies[op].append(time.perf_counter() - t0)
+    return ret is None or ret is False
+
+
+def main():
+    args = get_args()
+    if "-h" in args or "--help" in args:
+        manual()
+        return
+    clients = int(args.get("-c", CLIENTS))
+    commands = int(args.get("-n", COMMANDS))
+    devices = int(args.get("-d", DEVICES))
+    workers = int(args["--workers"]) if "--workers" in args else None
+    max_connections = int(args.get("--max-connections", MAX_CONNECTIONS))
+    buffer_size = int(args.get("--buffer", BUFFER_SIZE))
+    secured = "--secured" in args
+    depth = int(args.get("--depth", DEPTH)) if "--pipelined" in args else 0
+
+    workdir = tempfile.mkdtemp()
+    conf = Config(os.path.join(workdir, "config.json"))
+    conf.i2tcp_port = random.randint(20000, 40000)
+    conf.log_file = os.path.join(workdir, "i2ll.log")
+    conf.log_level = "WARNING"
+    conf.saveConfig()
+    for i in range(devices):
+        conf.addDevice()
+
+    broker = LoopbackBroker()
+    srv = LLServer(conf, max_connections=max_connections, secured_connection=secured,
+                   max_buffer_size=buffer_size, verbose=False, command_workers=workers,
+                   transport=LoopbackTransport(broker, "server"))
+    srv.start()
+    while srv.subscription_duration is None:
+        time.sleep(0.01)
+
+    device = LoopbackTransport(broker, "devices")
+    device.connect()
+    live = [True]
+    hb = threading.Thread(target=heartbeatThread,
+                          args=(device, [srv[i].feedback_topic for i in range(len(srv))], lambda: live[0]))
+    hb.start()
+
+    print("{} client(s) x {} command(s) against {} device(s), max_connections={}, buffer={}, "
+          "workers={}, secured={}, depth={}".format(clients, commands, devices, max_connections,
+                                                    buffer_size, srv.command_workers, secured, depth))
+
+    results = {}
+    barrier = threading.Barrier(clients + 1)
+    threads = [threading.Thread(target=clientThread,
+                                args=(i, conf.i2tcp_port, conf.i2tcp_psk, secured, commands, depth,
+                                      barrier, results))
+               for i in range(clients)]
+    for ele in threads:
+        ele.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for ele in threads:
+        ele.join()
+
+    live[0] = False
+    hb.join()
+
+    connected = [ele for ele in results.values() if ele["connected"]]
+    latencies = {op: sorted(sum((ele["latencies"][op] for ele in connected), [])) for op in OPERATIONS}
+    total = sum(len(ele) for ele in latencies.values())
+    dt = max([ele["done"] for ele in connected] or [t0]) - t0 or float("nan")
+    print("")
+    print("connected clients:      {}/{}".format(len(connected), clients))
+    if connected:
+        connect_times = sorted(ele["connect_time"] for ele in connected)
+        print("connect time:           p50 {:.1f}ms, p99 {:.1f}ms".format(
+            percentile(connect_times, 50) * 1000, percentile(connect_times, 99) * 1000))
+    print("commands:               {} in {:.2f}s, {:.0f} command(s)/s, {} failed".format(
+        total, dt, total / dt, sum(ele["failures"] for ele in connected)))
+    for op in OPERATIONS:
+        samples = latencies[op]
+        print("{:<23} p50 {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms".format(
+            op + ":", percentile(samples, 50) * 1000, percentile(samples, 99) * 1000,
+            (samples[-1] if samples else float("nan")) * 1000))
+    print("server command latency: p50 <= {}s, p99 <= {}s".format(
+        srv.command_latency.percentile(50), srv.command_latency.percentile(99)))
+
+    srv.kill()
+    conf.close()
+
+
+if __name__ == '__main__':
+    main()
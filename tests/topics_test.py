@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# Author: i2cy(i2cy@outlook.com)
+# Project: ESP32S3LockingLock
+# Filename: topics_test
+# Created on: 2026/10/18
+
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from i2llservice.config import Config
+from i2llservice.server import LLServer
+from i2llservice.topics import TopicIndex
+from i2llservice.transport import LoopbackBroker, LoopbackTransport
+
+
+def makeServer(workdir, device_ids):
+    conf = Config(os.path.join(workdir, "config.json"))
+    conf.log_file = os.path.join(workdir, "i2ll.log")
+    conf.log_level = "WARNING"
+    conf.saveConfig()
+    for ele in device_ids:
+        conf.addDevice(ele)
+
+    srv = LLServer(conf, secured_connection=False, verbose=False,
+                   transport=LoopbackTransport(LoopbackBroker(), "test"))
+    for device in conf:
+        srv.addDeviceClient(device)
+
+    return srv, conf
+
+
+def test_index_prefix_clash():
+    index = TopicIndex("data")
+    index.add("/esp32ll/dev_1", "dev_1")
+    index.add("/esp32ll/dev_12/", "dev_12")
+
+    assert index.match("/esp32ll/dev_1/data") == ("dev_1",)
+    assert index.match("/esp32ll/dev_12/data") == ("dev_12",)
+    assert index.match("/esp32ll/dev_123/data") == ()
+
+
+def test_device_lookup_prefix_clash():
+    with tempfile.TemporaryDirectory() as workdir:
+        srv, conf = makeServer(workdir, (1, 12))
+        try:
+            dev_1 = srv.getDeviceClient("/esp32ll/dev_1")
+            dev_12 = srv.getDeviceClient("/esp32ll/dev_12/")
+            assert dev_1 is not None and dev_1.topic_root == "/esp32ll/dev_1"
+            assert dev_12 is not None and dev_12.topic_root == "/esp32ll/dev_12"
+
+            assert srv.getDeviceClient("/esp32ll/dev_1/data", prefix=True) is dev_1
+            assert srv.getDeviceClient("/esp32ll/dev_12/data", prefix=True) is dev_12
+            assert srv.getDeviceClient("/esp32ll/dev_1/data") is None
+            assert srv.getDeviceClient("/esp32ll/dev_123", prefix=True) is None
+        finally:
+            srv.kill()
+            conf.close()
+
+
+def main():
+    test_index_prefix_clash()
+    test_device_lookup_prefix_clash()
+    print("all passed")
+
+
+if __name__ == '__main__':
+    main()